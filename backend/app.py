@@ -1,13 +1,22 @@
-from flask import Flask, send_file, jsonify, request, json, send_from_directory
+from flask import Flask, Response, send_file, jsonify, request, json, send_from_directory, stream_with_context
 from flask_cors import CORS
+from werkzeug.serving import is_running_from_reloader
 import os
 import logging
 import pandas as pd
-import difflib  
-import urllib.parse
-from rapidfuzz import fuzz
 
-from cleaning_scripts import campaigndonations
+# Serving path only: the build pipeline (campaigndonations, charts, matplotlib)
+# is never imported here; benchmarks/bench_cold_start.py checks this
+from cleaning_scripts.aggregates import TIMESERIES_FREQUENCIES, slice_series
+from cleaning_scripts.overlap import OVERLAP_KINDS, shared_between
+import data_store
+from data_store import OUTPUT_FOLDER, get_candidate_data, get_candidate_set, get_global_donor_index, status
+from donor_index import SUGGESTION_LIMIT
+from query import parse_query
+from json_stream import STREAM_CHUNK_SIZE, frame_records, iter_chunks, iter_json_object, next_cursor, read_page, wants_stream
+from instrumentation import init_app as init_instrumentation, phase
+from refresher import refresher
+from response_cache import MAX_AGE, cache as response_cache, cached_response
 
 app = Flask(__name__)
 CORS(app, resources={r"/*": {
@@ -20,14 +29,28 @@ CORS(app, resources={r"/*": {
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 
+# Server-Timing, /metrics and per-request profiles, when API_INSTRUMENTATION=1
+init_instrumentation(app, lambda: {
+    "api_loaded_candidates": len(data_store.store.entries()),
+    "api_contribution_store_bytes": data_store.store.total_bytes(),
+    "api_response_cache_bytes": response_cache.total_bytes(),
+})
+
 # Folder paths
 BASE_DIR = os.path.dirname(__file__)
 DATA_FOLDER = os.path.join(BASE_DIR, "cleaning_scripts", "candidate_contributions")
 CHART_FOLDER = os.path.join(BASE_DIR, "charts")
-OUTPUT_FOLDER = os.path.join(BASE_DIR, "cleaning_scripts", "output")
 VENDOR_FOLDER = os.path.join(BASE_DIR, "cleaning_scripts", "vendors")
+# OUTPUT_FOLDER is the contribution store's folder, see data_store
+
 
+# Version source for routes built from every candidate's data
+def all_candidates(**view_args):
+    return get_candidate_set()
 
+
+# Downloads get conditional GET support (ETag, Last-Modified, 304) from
+# send_file itself; JSON routes use response_cache
 @app.route("/api/download/<candidate>", methods=["GET"])
 def download_candidate_csv(candidate):
     filename = f"{candidate}Contributions.csv"
@@ -35,63 +58,33 @@ def download_candidate_csv(candidate):
 
     if os.path.exists(filepath):
         logging.info(f"Sending file: {filepath}")
-        return send_file(filepath, as_attachment=True)
+        return send_file(filepath, as_attachment=True, max_age=MAX_AGE)
     else:
         return jsonify({"error": "File not found"}), 404
 
 
 
+# Summaries come from the candidate's precomputed aggregate bundle (see
+# cleaning_scripts/aggregates.py), computed live only when the bundle is stale
 @app.route("/api/contributions/<candidate>", methods=["GET"])
+@cached_response(get_candidate_data)
 def get_contributions(candidate):
-    filename = f"{candidate}_combined_contributions.csv"
-    path = os.path.join(OUTPUT_FOLDER, filename)
-
-    if not os.path.exists(path):
+    data = get_candidate_data(candidate)
+    if data is None:
         return jsonify({"error": "File not found"}), 404
 
-    df = pd.read_csv(path)
-    grouped = df.groupby("ContributorGroup")["ContributionAmount"].sum().reset_index()
-    result = grouped.to_dict(orient="records")
-    return jsonify(result)
+    return jsonify(data.aggregates["group_totals"])
 
 
 @app.route("/api/top_donors_csv/<candidate>", methods=["GET"])
+@cached_response(get_candidate_data)
 def get_top_donors_csv(candidate):
-    filename = f"{candidate}_combined_contributions.csv"
-    path = os.path.join(OUTPUT_FOLDER, filename)
-
-    if not os.path.exists(path):
+    data = get_candidate_data(candidate)
+    if data is None:
         return jsonify({"error": "File not found"}), 404
 
     try:
-        df = pd.read_csv(path)
-
-        # Construct ContributorName
-        df["First_Name"] = df["First_Name"].fillna("")
-        df["Last_Name"] = df["Last_Name"].fillna("")
-        df["Business_Name"] = df["Business_Name"].fillna("")
-
-        df["ContributorName"] = df["First_Name"].str.strip() + " " + df["Last_Name"].str.strip()
-        df["ContributorName"] = df.apply(
-            lambda row: row["Business_Name"] if row["ContributorName"].strip() == "" else row["ContributorName"],
-            axis=1
-        )
-
-        grouped = (
-            df.groupby("ContributorName", as_index=False)["ContributionAmount"]
-            .sum()
-            .sort_values("ContributionAmount", ascending=False)
-            .head(10)
-        )
-
-        grouped = grouped.merge(
-            df[["ContributorName", "Employer", "Donor_City"]].drop_duplicates("ContributorName"),
-            on="ContributorName",
-            how="left"
-        )
-
-        return jsonify(grouped.to_dict(orient="records"))
-
+        return jsonify(data.aggregates["top_donors"])
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
@@ -101,77 +94,92 @@ def csv_to_json_response(filename):
     if not os.path.exists(path):
         return jsonify({"error": "File not found"}), 404
     try:
-        df = pd.read_csv(path)
-        return jsonify(df.to_dict(orient="records"))
+        cursor, limit = read_page(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Only the requested rows are parsed; streaming reads the file in chunks
+    skip = range(1, cursor + 1)
+    if wants_stream(request.args):
+        chunks = pd.read_csv(path, skiprows=skip, chunksize=STREAM_CHUNK_SIZE)
+        records = (frame_records(chunk.astype(object).where(chunk.notna(), None)) for chunk in chunks)
+        return Response(stream_with_context(iter_json_object({}, "records", records)), mimetype="application/json")
+
+    try:
+        df = pd.read_csv(path, skiprows=skip, nrows=limit + 1)
+        has_more = len(df) > limit
+        df = df.head(limit)
+        return jsonify({
+            "records": frame_records(df.astype(object).where(df.notna(), None)),
+            "next_cursor": cursor + limit if has_more else None
+        })
     except Exception as e:
         logging.error(f"Failed to parse CSV {filename}: {e}")
         return jsonify({"error": "Failed to parse CSV"}), 500
 
 @app.route("/api/repeat_donors/<candidate>", methods=["GET"])
+@cached_response(get_candidate_data)
 def get_repeat_donor_frequency(candidate):
-    filename = f"{candidate}_combined_contributions.csv"
-    filepath = os.path.join(OUTPUT_FOLDER, filename)
+    data = get_candidate_data(candidate)
+    if data is None:
+        return jsonify({"error": "File not found"}), 404
 
-    if not os.path.exists(filepath):
+    try:
+        series = slice_series(data.aggregates["repeat_donor_months"], "M", request.args.get("start"), request.args.get("end"))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid date: {e}"}), 400
+    return jsonify({"candidate": candidate, "freq": "month", **series})
+
+
+# Contribution totals and counts per day, week or month, split by ContributorGroup.
+# ?freq=day|week|month (default month), optional ?start=&end= dates (YYYY-MM-DD)
+@app.route("/api/timeseries/<candidate>", methods=["GET"])
+@cached_response(get_candidate_data)
+def get_timeseries(candidate):
+    freq = request.args.get("freq", "month")
+    if freq not in TIMESERIES_FREQUENCIES:
+        return jsonify({"error": f"freq must be one of {', '.join(TIMESERIES_FREQUENCIES)}"}), 400
+
+    data = get_candidate_data(candidate)
+    if data is None:
         return jsonify({"error": "File not found"}), 404
 
     try:
-        df = pd.read_csv(filepath)
-        df["ContributionDate"] = pd.to_datetime(df["ContributionDate"], errors="coerce")
-        df = df.dropna(subset=["ContributionDate", "First_Name", "Last_Name"])
-        df["DonorName"] = df["First_Name"].fillna('') + " " + df["Last_Name"].fillna('')
-        df["DonorName"] = df["DonorName"].str.strip()
-        df["Month"] = df["ContributionDate"].dt.to_period("M").astype(str)
-
-        monthly_counts = df.groupby(["DonorName", "Month"]).size().reset_index(name="DonationCount")
-        top_donors = (
-            monthly_counts.groupby("DonorName")["DonationCount"]
-            .count()
-            .sort_values(ascending=False)
-            .head(5)
-            .index
+        series = slice_series(
+            data.aggregates["timeseries"][freq],
+            TIMESERIES_FREQUENCIES[freq],
+            request.args.get("start"),
+            request.args.get("end")
         )
+    except ValueError as e:
+        return jsonify({"error": f"Invalid date: {e}"}), 400
+    return jsonify({"candidate": candidate, "freq": freq, **series})
 
-        filtered = monthly_counts[monthly_counts["DonorName"].isin(top_donors)]
-        donor_data = {}
-        for donor in top_donors:
-            donor_df = filtered[filtered["DonorName"] == donor]
-            monthly_data = {row["Month"]: row["DonationCount"] for _, row in donor_df.iterrows()}
-            donor_data[donor] = monthly_data
-
-        return jsonify(donor_data)
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-
-
-@app.route("/api/search_donor/<candidate>", methods=["GET"])
-def search_donor(candidate):
-    name_query = request.args.get("q", "").strip().lower()
-    if not name_query:
-        return jsonify({"error": "Missing query"}), 400
 
-    filename = f"{candidate}_combined_contributions.csv"
-    filepath = os.path.join(OUTPUT_FOLDER, filename)
+# Totals and counts grouped by any of query.DIMENSIONS, filtered by date,
+# amount and ContributorGroup; see query.py for the parameters
+@app.route("/api/query/<candidate>", methods=["GET"])
+@cached_response(get_candidate_data)
+def query_contributions(candidate):
+    try:
+        query = parse_query(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    if not os.path.exists(filepath):
+    data = get_candidate_data(candidate)
+    if data is None:
         return jsonify({"error": "File not found"}), 404
 
-    df = pd.read_csv(filepath)
-
-    # Construct ContributorName
-    df["ContributorName"] = df.apply(
-        lambda row: f"{row['First_Name']} {row['Last_Name']}".strip()
-        if pd.notna(row["First_Name"]) or pd.notna(row["Last_Name"])
-        else row["Business_Name"] if pd.notna(row["Business_Name"]) else "Unknown",
-        axis=1
-    )
-    df["ContributorName_lower"] = df["ContributorName"].str.lower().fillna("")
+    with phase("aggregate"):
+        result = data.query_engine.run(query)
+    return jsonify({"candidate": candidate, "query": query, **result})
 
-    # Exact matches first
-    exact_matches = df[df["ContributorName_lower"] == name_query]
 
-    if not exact_matches.empty:
-        history = exact_matches[[
+# Contribution records of one donor in the shape search responses return.
+# Callers pass one page or stream chunk at a time.
+def donor_history(matches):
+    with phase("transform"):
+        history = matches[[
             "ContributorName",
             "ContributionAmount",
             "ContributionDate",
@@ -179,87 +187,181 @@ def search_donor(candidate):
             "ContributorGroup"
         ]].copy()
 
+        history["ContributionDate"] = history["ContributionDate"].dt.strftime("%m/%d/%Y").astype(object)
         history["ContributionDate"] = history["ContributionDate"].where(pd.notnull(history["ContributionDate"]), None)
+        history["Donor_City"] = history["Donor_City"].astype(object)
         history["Donor_City"] = history["Donor_City"].where(pd.notnull(history["Donor_City"]), None)
+        history["ContributorGroup"] = history["ContributorGroup"].astype(object)
         history["ContributorGroup"] = history["ContributorGroup"].where(pd.notnull(history["ContributorGroup"]), "Unknown")
+        return frame_records(history)
 
-        return jsonify({
-            "status": "found",
-            "donor": name_query,
-            "records": history.to_dict(orient="records")
-        })
 
-    # Substring match (no fuzzy, just contains)
-    substring_matches = df[df["ContributorName_lower"].str.contains(name_query)]
+# Records are paged with ?cursor=&limit= (default 500 per page), or streamed
+# from ?cursor= to the end with ?stream=1. Suggestions page the same way.
+def records_response(fields, matches, history=donor_history):
+    try:
+        cursor, limit = read_page(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    if not substring_matches.empty:
-        suggestions = (
-            substring_matches["ContributorName"]
-            .dropna()
-            .unique()
-            .tolist()
-        )
-        return jsonify({
-            "status": "not_found",
-            "query": name_query,
-            "suggestions": suggestions
-        })
+    fields = {**fields, "total_records": len(matches)}
+    if wants_stream(request.args):
+        chunks = (history(chunk) for chunk in iter_chunks(matches.iloc[cursor:]))
+        return Response(stream_with_context(iter_json_object(fields, "records", chunks)), mimetype="application/json")
+
+    return jsonify({
+        **fields,
+        "records": history(matches.iloc[cursor:cursor + limit]),
+        "next_cursor": next_cursor(cursor, limit, len(matches))
+    })
+
+
+def suggestions_response(index, name_query):
+    try:
+        cursor, limit = read_page(request.args, default_limit=SUGGESTION_LIMIT)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
+    suggestions, next_page = index.suggest(name_query, limit, cursor)
     return jsonify({
         "status": "not_found",
         "query": name_query,
-        "suggestions": []
+        "suggestions": suggestions,
+        "next_cursor": next_page
     })
 
 
-@app.route("/api/repeated_donors/<candidate>", methods=["GET"])
-def get_repeated_donors(candidate):
-    filename = f"{candidate}_combined_contributions.csv"
-    path = os.path.join(OUTPUT_FOLDER, filename)
+@app.route("/api/search_donor/<candidate>", methods=["GET"])
+@cached_response(get_candidate_data)
+def search_donor(candidate):
+    name_query = request.args.get("q", "").strip().lower()
+    if not name_query:
+        return jsonify({"error": "Missing query"}), 400
 
-    if not os.path.exists(path):
+    data = get_candidate_data(candidate)
+    if data is None:
         return jsonify({"error": "File not found"}), 404
 
-    df = pd.read_csv(path)
+    # Exact matches first, compared on the normalized contributor key
+    index = data.donor_index
+    rows = index.lookup(name_query)
+
+    if rows is not None:
+        return records_response({"status": "found", "donor": name_query}, data.frame.iloc[rows])
+
+    # Donors whose name contains the query, else the closest fuzzy matches
+    return suggestions_response(index, name_query)
+
+
+# Search one donor across every candidate: what they gave to each, in one
+# response. Per-candidate totals come first; the records, each tagged with its
+# candidate, are grouped by candidate (largest total first) and page and
+# stream like the per-candidate search.
+def candidate_history(matches):
+    records = donor_history(matches)
+    for record, candidate in zip(records, matches["Candidate"].tolist()):
+        record["candidate"] = candidate
+    return records
+
+
+@app.route("/api/search_donor", methods=["GET"])
+@cached_response(all_candidates)
+def search_donor_all():
+    name_query = request.args.get("q", "").strip().lower()
+    if not name_query:
+        return jsonify({"error": "Missing query"}), 400
+
+    index = get_global_donor_index()
+    matches = index.lookup(name_query)
+
+    if matches is not None:
+        with phase("transform"):
+            by_candidate = matches.groupby("Candidate", observed=True, sort=False)["ContributionAmount"]
+            totals = by_candidate.agg(["sum", "size"]).sort_values("sum", ascending=False, kind="stable")
+            candidates = [
+                {"candidate": candidate, "total": round(float(total), 2), "count": int(count)}
+                for candidate, total, count in zip(totals.index.tolist(), totals["sum"].tolist(), totals["size"].tolist())
+            ]
+            ranks = {candidate: rank for rank, candidate in enumerate(totals.index.tolist())}
+            order = matches["Candidate"].astype(object).map(ranks).to_numpy().argsort(kind="stable")
+
+        return records_response({
+            "status": "found",
+            "donor": name_query,
+            "total": round(float(matches["ContributionAmount"].sum()), 2),
+            "candidates": candidates
+        }, matches.iloc[order], candidate_history)
+
+    return suggestions_response(index, name_query)
+
+
+# Every candidate side by side: totals, group breakdowns, donor counts,
+# median gift and how many donors each pair of campaigns shares
+@app.route("/api/compare", methods=["GET"])
+@cached_response(all_candidates)
+def compare_candidates():
+    return jsonify(get_candidate_set().comparison)
 
-    df["ContributorName"] = df.apply(
-        lambda row: f"{row['First_Name']} {row['Last_Name']}".strip()
-        if pd.notna(row["First_Name"]) or pd.notna(row["Last_Name"])
-        else row["Business_Name"] if pd.notna(row["Business_Name"]) else "Unknown",
-        axis=1
-    )
 
-    counts = df.groupby("ContributorName").size()
-    multiple_donors = counts[counts > 1].index.tolist()
+# Candidate x candidate counts of shared donors and shared employers
+@app.route("/api/overlap", methods=["GET"])
+@cached_response(all_candidates)
+def get_overlap_matrix():
+    overlap = get_candidate_set().overlap
+    return jsonify({
+        "candidates": overlap["candidates"],
+        "donors": overlap["donors"]["matrix"],
+        "employers": overlap["employers"]["matrix"]
+    })
 
-    repeated_df = df[df["ContributorName"].isin(multiple_donors)]
 
-    summary = repeated_df.groupby("ContributorName")["ContributionAmount"].sum().reset_index()
-    summary = summary.rename(columns={"ContributionAmount": "TotalAmount"})
-    summary = summary.sort_values(by="TotalAmount", ascending=False).head(10)
+# Donors (or ?kind=employers) who gave to both campaigns, largest combined first.
+# Paged with ?cursor=&limit= like the search records.
+@app.route("/api/overlap/<candidate_a>/<candidate_b>", methods=["GET"])
+@cached_response(all_candidates)
+def get_overlap_pair(candidate_a, candidate_b):
+    kind = request.args.get("kind", "donors")
+    if kind not in OVERLAP_KINDS:
+        return jsonify({"error": f"kind must be one of {', '.join(OVERLAP_KINDS)}"}), 400
+    try:
+        cursor, limit = read_page(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    return jsonify(summary.to_dict(orient="records"))
+    shared = shared_between(get_candidate_set().overlap, kind, candidate_a, candidate_b)
+    if shared is None:
+        return jsonify({"error": "Unknown candidate pair"}), 404
+
+    return jsonify({
+        "candidates": [candidate_a, candidate_b],
+        "kind": kind,
+        "total_records": len(shared),
+        "records": shared[cursor:cursor + limit],
+        "next_cursor": next_cursor(cursor, limit, len(shared))
+    })
+
+
+@app.route("/api/repeated_donors/<candidate>", methods=["GET"])
+@cached_response(get_candidate_data)
+def get_repeated_donors(candidate):
+    data = get_candidate_data(candidate)
+    if data is None:
+        return jsonify({"error": "File not found"}), 404
+
+    return jsonify(data.aggregates["repeat_donors"])
 
 
 # --- New: Top Donors Bar Chart data endpoint ---
 @app.route("/api/top_donors_bar/<candidate>", methods=["GET"])
+@cached_response(get_candidate_data)
 def top_donors_bar(candidate):
-    filename = f"{candidate}_combined_contributions.csv"
-    path = os.path.join(OUTPUT_FOLDER, filename)
-    if not os.path.exists(path):
+    candidate_data = get_candidate_data(candidate)
+    if candidate_data is None:
         return jsonify({"error": "File not found"}), 404
 
-    df = pd.read_csv(path)
-    df["ContributorName"] = df.apply(
-        lambda row: f"{row['First_Name']} {row['Last_Name']}".strip()
-        if pd.notna(row["First_Name"]) or pd.notna(row["Last_Name"])
-        else row["Business_Name"] if pd.notna(row["Business_Name"]) else "Unknown",
-        axis=1
-    )
-
-    top_donors = df.groupby("ContributorName")["ContributionAmount"].sum().sort_values(ascending=False).head(10)
-    labels = top_donors.index.tolist()
-    data = top_donors.values.tolist()
+    top_donors = candidate_data.aggregates["top_donors"]
+    labels = [row["ContributorName"] for row in top_donors]
+    data = [row["ContributionAmount"] for row in top_donors]
 
     # Generate distinct colors for bars
     backgroundColor = [
@@ -278,27 +380,16 @@ def top_donors_bar(candidate):
     return jsonify(chart_data)
 
 @app.route("/api/top_employers_bar/<candidate>", methods=["GET"])
+@cached_response(get_candidate_data)
 def top_employers_bar(candidate):
-    filename = f"{candidate}_combined_contributions.csv"
-    path = os.path.join(OUTPUT_FOLDER, filename)
-    if not os.path.exists(path):
+    candidate_data = get_candidate_data(candidate)
+    if candidate_data is None:
         return jsonify({"error": "File not found"}), 404
 
-    df = pd.read_csv(path)
-    
-    # Filter for records with valid Employer values
-    df = df[df["Employer"].notna()]
-    
-    # Group by Employer and sum contributions
-    top_employers = (
-        df.groupby("Employer")["ContributionAmount"]
-        .sum()
-        .sort_values(ascending=False)
-        .head(10)
-    )
-    
-    labels = top_employers.index.tolist()
-    data = top_employers.values.tolist()
+    # Top employers by total contributed, records without an Employer excluded
+    top_employers = candidate_data.aggregates["top_employers"]
+    labels = [row["Employer"] for row in top_employers]
+    data = [row["ContributionAmount"] for row in top_employers]
 
     # Generate distinct colors for bars
     backgroundColor = [
@@ -318,31 +409,15 @@ def top_employers_bar(candidate):
 
 # --- New: Repeated Donors Bar Chart data endpoint ---
 @app.route("/api/repeat_donors_bar/<candidate>", methods=["GET"])
+@cached_response(get_candidate_data)
 def repeat_donors_bar(candidate):
-    filename = f"{candidate}_combined_contributions.csv"
-    path = os.path.join(OUTPUT_FOLDER, filename)
-    if not os.path.exists(path):
+    candidate_data = get_candidate_data(candidate)
+    if candidate_data is None:
         return jsonify({"error": "File not found"}), 404
 
-    df = pd.read_csv(path)
-    df["ContributorName"] = df.apply(
-        lambda row: f"{row['First_Name']} {row['Last_Name']}".strip()
-        if pd.notna(row["First_Name"]) or pd.notna(row["Last_Name"])
-        else row["Business_Name"] if pd.notna(row["Business_Name"]) else "Unknown",
-        axis=1
-    )
-
-    counts = df.groupby("ContributorName").size()
-    multiple_donors = counts[counts > 1].index.tolist()
-
-    repeated_df = df[df["ContributorName"].isin(multiple_donors)]
-
-    summary = repeated_df.groupby("ContributorName")["ContributionAmount"].sum().reset_index()
-    summary = summary.rename(columns={"ContributionAmount": "TotalAmount"})
-    summary = summary.sort_values(by="TotalAmount", ascending=False).head(10)
-
-    labels = summary["ContributorName"].tolist()
-    data = summary["TotalAmount"].tolist()
+    summary = candidate_data.aggregates["repeat_donors"]
+    labels = [row["ContributorName"] for row in summary]
+    data = [row["TotalAmount"] for row in summary]
 
     backgroundColor = [
         "#4e79a7", "#f28e2b", "#e15759", "#76b7b2", "#59a14f",
@@ -364,33 +439,49 @@ def repeat_donors_bar(candidate):
 def download_file(filename):
     filepath = os.path.join(OUTPUT_FOLDER, filename)
     if os.path.exists(filepath):
-        return send_from_directory(OUTPUT_FOLDER, filename, as_attachment=True)
+        return send_from_directory(OUTPUT_FOLDER, filename, as_attachment=True, max_age=MAX_AGE)
     else:
         return "File not found", 404
     
 @app.route("/api/total_donations/<candidate>", methods=["GET"])
+@cached_response(get_candidate_data)
 def get_total_donations(candidate):
-    filename = f"{candidate}_combined_contributions.csv"
-    filepath = os.path.join(OUTPUT_FOLDER, filename)
-
-    if not os.path.exists(filepath):
+    data = get_candidate_data(candidate)
+    if data is None:
         return jsonify({"error": "File not found"}), 404
 
-    df = pd.read_csv(filepath)
-    df.drop_duplicates(inplace=True)
-    total = df["ContributionAmount"].sum()
-    total = float(round(total, 2))  
     return jsonify({
         "candidate": candidate,
-        "total_donations": round(total, 2)
+        "total_donations": data.aggregates["total_donations"]
     })
 
 @app.route('/download/p2p-2024')
 def download_p2p_contributions():
     directory = os.path.join(os.getcwd(), 'backend/cleaning_scripts/raw')
     filename = 'P2P_2024_Contributions.html'
-    return send_from_directory(directory, filename, as_attachment=True)
+    return send_from_directory(directory, filename, as_attachment=True, max_age=MAX_AGE)
+
+
+# Liveness: the process is up and answering
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    return jsonify({"status": "ok"})
+
+
+# Readiness: every candidate's data is loaded. Reports the data version and
+# load times; 503 until there is data to serve.
+@app.route("/readyz", methods=["GET"])
+def readyz():
+    try:
+        report = status()
+    except Exception as e:
+        logging.error(f"Readiness check failed: {e}")
+        return jsonify({"ready": False, "error": str(e)}), 503
+    return jsonify(report), 200 if report["ready"] else 503
 
 
 if __name__ == "__main__":
+    # The debug reloader serves from a child process; only that one refreshes
+    if is_running_from_reloader():
+        refresher.start()
     app.run(debug=True, port=5000)
\ No newline at end of file
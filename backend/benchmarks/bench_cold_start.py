@@ -0,0 +1,123 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from data_store import list_candidates
+
+# Cold start of the API: how long a fresh process takes to import app.py and
+# how much memory a gunicorn worker holds, idle and after serving each
+# candidate once. Libraries only the cleaning pipeline needs must not show up
+# among the modules the API loads.
+# gunicorn reads backend/gunicorn.conf.py, so the data is preloaded in the
+# master unless GUNICORN_PRELOAD=0 is set.
+# Reads worker memory from /proc, so it runs on Linux only.
+# Usage: python backend/benchmarks/bench_cold_start.py [--runs N]
+
+BUILD_ONLY_MODULES = ["matplotlib", "bs4", "openpyxl", "cleaning_scripts.campaigndonations", "cleaning_scripts.charts"]
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+rss = int(next(line for line in open("/proc/self/status") if line.startswith("VmRSS")).split()[1])
+print(json.dumps({"seconds": elapsed, "rss_kib": rss, "modules": sorted(m for m in %r if m in sys.modules)}))
+"""
+
+
+def rss_kib(pid):
+    with open(f"/proc/{pid}/status") as file:
+        for line in file:
+            if line.startswith("VmRSS"):
+                return int(line.split()[1])
+    return 0
+
+
+def worker_pids(master_pid):
+    with open(f"/proc/{master_pid}/task/{master_pid}/children") as file:
+        return [int(pid) for pid in file.read().split()]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_import():
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE % BUILD_ONLY_MODULES],
+        cwd=BASE_DIR, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def get(url):
+    with urllib.request.urlopen(url, timeout=30) as response:
+        response.read()
+
+
+def measure_gunicorn(candidates):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--workers", "1", "--bind", f"127.0.0.1:{port}", "app:app"],
+        cwd=BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        # The first answer, even a 404, means a worker has imported the app
+        while True:
+            if server.poll() is not None:
+                raise SystemExit("gunicorn exited during startup")
+            try:
+                get(f"{base_url}/api/ping-cold-start")
+            except urllib.error.HTTPError:
+                break
+            except OSError:
+                time.sleep(0.01)
+        ready = time.perf_counter() - start
+        worker = worker_pids(server.pid)[0]
+        idle_rss = rss_kib(worker)
+
+        start = time.perf_counter()
+        for candidate in candidates:
+            get(f"{base_url}/api/contributions/{urllib.request.quote(candidate)}")
+        first_requests = time.perf_counter() - start
+        return ready, first_requests, idle_rss, rss_kib(worker)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    runs = int(sys.argv[sys.argv.index("--runs") + 1]) if "--runs" in sys.argv else 3
+    candidates = list_candidates()
+
+    print(f"{'run':<4} {'import s':>9} {'import MiB':>11} {'ready s':>8} {'first req s':>12} {'idle MiB':>9} {'served MiB':>11}")
+    imports, readies = [], []
+    for run in range(1, runs + 1):
+        probe = measure_import()
+        ready, first_requests, idle_rss, served_rss = measure_gunicorn(candidates)
+        imports.append(probe["seconds"])
+        readies.append(ready)
+        print(f"{run:<4} {probe['seconds']:>9.2f} {probe['rss_kib'] / 1024:>11.1f} {ready:>8.2f} "
+              f"{first_requests:>12.2f} {idle_rss / 1024:>9.1f} {served_rss / 1024:>11.1f}")
+
+    print(f"\nBest of {runs}: import {min(imports):.2f}s, worker ready {min(readies):.2f}s "
+          f"({len(candidates)} candidates served in the first requests)")
+    if probe["modules"]:
+        raise SystemExit(f"API imports build-only modules: {', '.join(probe['modules'])}")
+    print("No build-only modules imported by the API")
+
+
+if __name__ == "__main__":
+    main()
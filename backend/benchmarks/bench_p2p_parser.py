@@ -0,0 +1,76 @@
+import hashlib
+import os
+import sys
+import time
+import tracemalloc
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from cleaning_scripts.p2p_contributions import html_pattern, row_parsers
+
+RAW_FOLDER = os.path.join(BASE_DIR, "cleaning_scripts", "raw")
+
+# Compares the BeautifulSoup and streaming row parsers on every raw P2P file.
+# Both must yield the same rows; we report wall time and, with --memory,
+# peak traced memory (a second pass, since tracemalloc slows parsing down).
+# Usage: python backend/benchmarks/bench_p2p_parser.py [--memory]
+
+
+def consume(parser, filepath):
+    # Rows are hashed as they arrive so the benchmark itself holds no rows
+    digest = hashlib.sha1()
+    count = 0
+    for row in row_parsers[parser](filepath):
+        digest.update("\x1f".join(row).encode("utf-8") + b"\x1e")
+        count += 1
+    return count, digest.hexdigest()
+
+
+def measure_time(parser, filepath):
+    start = time.perf_counter()
+    result = consume(parser, filepath)
+    return result, time.perf_counter() - start
+
+
+def measure_peak(parser, filepath):
+    tracemalloc.start()
+    consume(parser, filepath)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    with_memory = "--memory" in sys.argv
+    totals = {name: 0.0 for name in row_parsers}
+    filenames = sorted(f for f in os.listdir(RAW_FOLDER) if html_pattern.match(f))
+
+    header = f"{'file':<30} {'rows':>7} {'soup s':>8} {'stream s':>9}"
+    if with_memory:
+        header += f" {'soup MiB':>9} {'stream MiB':>11}"
+    print(header)
+
+    for filename in filenames:
+        filepath = os.path.join(RAW_FOLDER, filename)
+        (soup_count, soup_digest), soup_time = measure_time("soup", filepath)
+        (stream_count, stream_digest), stream_time = measure_time("stream", filepath)
+
+        if (soup_count, soup_digest) != (stream_count, stream_digest):
+            raise SystemExit(f"Parsers disagree on {filename}")
+
+        totals["soup"] += soup_time
+        totals["stream"] += stream_time
+        line = f"{filename:<30} {stream_count:>7} {soup_time:>8.2f} {stream_time:>9.2f}"
+        if with_memory:
+            soup_peak = measure_peak("soup", filepath)
+            stream_peak = measure_peak("stream", filepath)
+            line += f" {soup_peak / 2**20:>9.1f} {stream_peak / 2**20:>11.1f}"
+        print(line)
+
+    print(f"\nTotal: soup {totals['soup']:.2f}s, stream {totals['stream']:.2f}s "
+          f"({totals['soup'] / totals['stream']:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
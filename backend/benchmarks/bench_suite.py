@@ -0,0 +1,419 @@
+import argparse
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+# Benchmarks for the cleaning pipeline and every /api route, on synthetic data
+# at several multiples of the real candidate filings.
+#
+# For each scale the raw ELEC files are tiled; every copy after the first
+# gets a distinct suffix on donor names, so donors (not just rows) grow with
+# the scale. The pipeline stages then run on that data in a child process,
+# timed one by one, and a second child process serves the result through
+# Flask's test client. Results go to a JSON file; --compare prints the change
+# between two such files (for example from two commits). Memory is read from
+# /proc, so it runs on Linux only.
+#
+# Usage:
+#   python backend/benchmarks/bench_suite.py [--scales 1,10,100] [--iterations 20] [--output FILE]
+#   python backend/benchmarks/bench_suite.py --compare OLD.json NEW.json
+
+DEFAULT_SCALES = "1,10,100"
+DEFAULT_ITERATIONS = 20
+P2P_YEARS = (2020, 2024)
+
+# (case, path) for the API benchmark; {candidate}, {other}, {donor}, {typo}
+# and {raw} are filled in from the data being served
+API_CASES = [
+    ("contributions", "/api/contributions/{candidate}"),
+    ("top_donors_csv", "/api/top_donors_csv/{candidate}"),
+    ("repeat_donors", "/api/repeat_donors/{candidate}"),
+    ("repeated_donors", "/api/repeated_donors/{candidate}"),
+    ("top_donors_bar", "/api/top_donors_bar/{candidate}"),
+    ("top_employers_bar", "/api/top_employers_bar/{candidate}"),
+    ("repeat_donors_bar", "/api/repeat_donors_bar/{candidate}"),
+    ("total_donations", "/api/total_donations/{candidate}"),
+    ("timeseries_day", "/api/timeseries/{candidate}?freq=day"),
+    ("timeseries_week", "/api/timeseries/{candidate}?freq=week"),
+    ("timeseries_month", "/api/timeseries/{candidate}?freq=month"),
+    ("search_donor_found", "/api/search_donor/{candidate}?q={donor}"),
+    ("search_donor_substring", "/api/search_donor/{candidate}?q=smith"),
+    ("search_donor_fuzzy", "/api/search_donor/{candidate}?q={typo}"),
+    ("search_donor_all", "/api/search_donor?q={donor}"),
+    ("search_donor_all_stream", "/api/search_donor?q={donor}&stream=1"),
+    ("query_group", "/api/query/{candidate}"),
+    ("query_employer_month", "/api/query/{candidate}?group_by=Employer,month&min_amount=100&top=50"),
+    ("compare", "/api/compare"),
+    ("overlap", "/api/overlap"),
+    ("overlap_pair", "/api/overlap/{candidate}/{other}?kind=employers"),
+    ("download", "/api/download/{raw}"),
+]
+
+
+def proc_status_mib(field):
+    # Memory figures from /proc (Linux); VmHWM is this process's peak RSS.
+    # ru_maxrss would include the parent's peak, which Linux carries across exec.
+    with open("/proc/self/status") as file:
+        for line in file:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+def rss_mib():
+    return proc_status_mib("VmRSS")
+
+
+def peak_rss_mib():
+    return proc_status_mib("VmHWM")
+
+
+def copy_tag(copy):
+    # Four letters per copy, far apart enough that fuzzy matching keeps copies distinct
+    digest = hashlib.sha1(str(copy).encode("ascii")).digest()
+    return "".join(chr(ord("A") + byte % 26) for byte in digest[:4])
+
+
+def synthetic_filing(path, scale):
+    raw = pd.read_csv(path, dtype=str)
+    copies = [raw]
+    for copy in range(1, scale):
+        df = raw.copy()
+        tag = " " + copy_tag(copy)
+        for column in ("LastName", "NonIndName"):
+            df[column] = df[column].where(df[column].isna(), df[column] + tag)
+        copies.append(df)
+    return pd.concat(copies, ignore_index=True)
+
+
+class StageTimer:
+    def __init__(self):
+        self.stages = {}
+
+    def run(self, stage, rows, build, *args):
+        # Accumulates per stage across candidates
+        start = time.perf_counter()
+        result = build(*args)
+        elapsed = time.perf_counter() - start
+        totals = self.stages.setdefault(stage, {"seconds": 0.0, "rows": 0})
+        totals["seconds"] += elapsed
+        totals["rows"] += rows
+        totals["rss_mib"] = rss_mib()
+        return result
+
+    def report(self):
+        for totals in self.stages.values():
+            totals["seconds"] = round(totals["seconds"], 4)
+            totals["rows_per_sec"] = round(totals["rows"] / totals["seconds"]) if totals["seconds"] else None
+        return self.stages
+
+
+def pipeline_worker(workdir, scale, p2p_table):
+    # Runs in its own process with workdir as the current directory, because
+    # the pipeline writes to output/ relative to it
+    from cleaning_scripts import campaigndonations as pipeline
+    from cleaning_scripts.charts import render_candidate_charts
+    from cleaning_scripts.combined_contributions import parse_contribution_dates
+    from cleaning_scripts.contributor_names import add_contributor_columns
+    from cleaning_scripts.deduplication import deduplicate_contributions
+    from cleaning_scripts.entity_resolution import add_entity_ids_across
+    from cleaning_scripts.p2p_contributions import load_p2p_contributions
+
+    os.chdir(workdir)
+    for folder in ("output", "raw", "charts"):
+        os.makedirs(folder, exist_ok=True)
+    timer = StageTimer()
+
+    p2p_df = timer.run("p2p_table", 0, load_p2p_contributions, p2p_table)
+    timer.stages["p2p_table"]["rows"] = len(p2p_df)
+
+    frames = {}
+    for candidate, source in pipeline.candidate_files.items():
+        filing_path = os.path.join("raw", os.path.basename(source))
+        synthetic_filing(source, scale).to_csv(filing_path, index=False)
+        filing_rows = sum(1 for _ in open(filing_path, encoding="utf-8")) - 1
+
+        elec = timer.run("read_filing", filing_rows, pipeline.get_individual_csv_data, filing_path)
+        p2p = timer.run("p2p_slice", len(p2p_df), pipeline.get_p2p_contributions, p2p_df, candidate)
+        df = pd.concat([elec, p2p], ignore_index=True)
+        rows = len(df)
+
+        df = timer.run("contributor_names", rows, add_contributor_columns, df)
+        frames[candidate] = timer.run("deduplication", rows, lambda: deduplicate_contributions(df, parse_contribution_dates(df["ContributionDate"])))
+
+    # Entity IDs are resolved over every candidate at once, as in the pipeline
+    frames = timer.run("entity_resolution", sum(map(len, frames.values())), add_entity_ids_across, frames)
+    for candidate, df in frames.items():
+        rows = len(df)
+        slug = candidate.replace(' ', '_')
+        timer.run("write_combined", rows, lambda: df.to_csv(f"output/{slug}_combined_contributions.csv", index=False))
+        timer.run("top_contributors", rows, pipeline.get_top_contributors, df, candidate)
+        timer.run("aggregates", rows, pipeline.write_candidate_aggregates, df, candidate)
+        timer.run("columnar", rows, pipeline.write_candidate_columnar, df, candidate)
+        bundle_path = pipeline.candidate_artifacts(candidate)["aggregates"][0]
+        timer.run("charts", rows, render_candidate_charts, candidate, bundle_path, "charts")
+
+    total_rows = timer.stages["write_combined"]["rows"]
+    timer.run("overlap", total_rows, pipeline.write_donor_overlap, pipeline.combined_outputs())
+
+    return {"rows": total_rows, "stages": timer.report(), "peak_rss_mib": round(peak_rss_mib(), 1)}
+
+
+def p2p_html_worker(workdir):
+    # The raw P2P HTML is fixed input, so this stage is only measured once
+    from cleaning_scripts.p2p_contributions import combine_html_p2p_data
+
+    raw_folder = os.path.join(BASE_DIR, "cleaning_scripts", "raw")
+    output_path = os.path.join(workdir, "p2p_from_html.parquet")
+    start = time.perf_counter()
+    combine_html_p2p_data(raw_folder, years=P2P_YEARS, output_path=output_path)
+    elapsed = time.perf_counter() - start
+    rows = len(pd.read_parquet(output_path)) if os.path.exists(output_path) else 0
+    return {
+        "seconds": round(elapsed, 4),
+        "rows": rows,
+        "rows_per_sec": round(rows / elapsed) if elapsed else None,
+        "peak_rss_mib": round(peak_rss_mib(), 1),
+    }
+
+
+def percentile(values, q):
+    return round(float(np.percentile(values, q)), 3)
+
+
+def api_worker(iterations):
+    # Serves CONTRIBUTION_STORE_FOLDER, set by the parent before this process started
+    import app as api
+    import data_store
+    from response_cache import cache
+
+    candidates = sorted(
+        data_store.list_candidates(),
+        key=lambda slug: os.path.getsize(data_store.combined_csv_path(slug)),
+        reverse=True,
+    )
+    candidate, other = candidates[0], candidates[1]
+    names = pd.read_csv(data_store.combined_csv_path(candidate), usecols=["ContributorName"])["ContributorName"]
+    donor = names.value_counts().index[0]
+    typo = donor[:-2] + donor[-1] + donor[-2]
+    # Downloads serve the raw filings, which are the same at every scale
+    raw = sorted(name for name in os.listdir(api.DATA_FOLDER) if name.endswith("Contributions.csv"))[0][:-len("Contributions.csv")]
+    fields = {"candidate": candidate, "other": other, "donor": donor, "typo": typo, "raw": raw}
+
+    # Cold work a fresh process does before its first response
+    warmup = {}
+    start = time.perf_counter()
+    for slug in candidates:
+        data_store.get_candidate_data(slug)
+    warmup["load_candidates"] = time.perf_counter() - start
+    data = data_store.get_candidate_data(candidate)
+    for name, build in [
+        ("aggregates", lambda: data.aggregates),
+        ("donor_index", lambda: data.donor_index),
+        ("query_engine", lambda: data.query_engine),
+        ("candidate_set", data_store.get_candidate_set),
+        ("global_donor_index", lambda: data_store.get_candidate_set().donor_index),
+        ("comparison", lambda: data_store.get_candidate_set().comparison),
+        ("overlap", lambda: data_store.get_candidate_set().overlap),
+    ]:
+        start = time.perf_counter()
+        build()
+        warmup[name] = time.perf_counter() - start
+
+    client = api.app.test_client()
+    adapter = api.app.url_map.bind("localhost")
+    covered = set()
+    results = {}
+    for case, template in API_CASES:
+        path = template.format(**fields)
+        covered.add(adapter.match(path.split("?")[0])[0])
+
+        uncached, cached = [], []
+        for _ in range(iterations):
+            cache.clear()
+            data.query_engine.clear()
+            start = time.perf_counter()
+            response = client.get(path)
+            streamed = response.is_streamed  # reading the body buffers it
+            response.get_data()
+            uncached.append((time.perf_counter() - start) * 1000)
+        for _ in range(iterations):
+            start = time.perf_counter()
+            client.get(path).get_data()
+            cached.append((time.perf_counter() - start) * 1000)
+
+        results[case] = {
+            "path": path,
+            "status": response.status_code,
+            "bytes": len(response.get_data()),
+            "streamed": streamed,
+            "p50_ms": percentile(uncached, 50),
+            "p95_ms": percentile(uncached, 95),
+            "cached_p50_ms": percentile(cached, 50),
+            "cached_p95_ms": percentile(cached, 95),
+        }
+
+    api_endpoints = {rule.endpoint for rule in api.app.url_map.iter_rules() if rule.rule.startswith("/api/")}
+    return {
+        "fields": fields,
+        "warmup_seconds": {name: round(seconds, 4) for name, seconds in warmup.items()},
+        "routes": results,
+        "uncovered_endpoints": sorted(api_endpoints - covered),
+        "peak_rss_mib": round(peak_rss_mib(), 1),
+    }
+
+
+def run_child(args, env=None):
+    # Each measurement gets a fresh process, so imports, caches and peak RSS
+    # do not carry over between scales
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), *args],
+        cwd=BASE_DIR, env={**os.environ, **(env or {})}, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"Benchmark step {args[0]} failed:\n{result.stderr[-4000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(scales, iterations, output, workdir):
+    from cleaning_scripts.p2p_contributions import load_p2p_contributions
+
+    results = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPUs",
+        "iterations": iterations,
+        "scales": {},
+    }
+
+    # Convert the P2P workbook once, so every scale reads the same typed table
+    p2p_table = os.path.join(workdir, "Combined_P2P_Contributions.parquet")
+    start = time.perf_counter()
+    load_p2p_contributions(p2p_table)
+    results["p2p_workbook_seconds"] = round(time.perf_counter() - start, 4)
+
+    print("p2p html parse ...", flush=True)
+    results["p2p_html"] = run_child(["--p2p-html-worker", workdir])
+
+    for scale in scales:
+        scale_dir = os.path.join(workdir, f"x{scale}")
+        os.makedirs(scale_dir, exist_ok=True)
+        print(f"x{scale} pipeline ...", flush=True)
+        pipeline = run_child(["--pipeline-worker", scale_dir, str(scale), p2p_table])
+        print(f"x{scale} api ...", flush=True)
+        api = run_child(
+            ["--api-worker", str(iterations)],
+            {"CONTRIBUTION_STORE_FOLDER": os.path.join(scale_dir, "output"), "RESPONSE_CACHE_MAX_BYTES": str(256 * 1024 * 1024)},
+        )
+        results["scales"][str(scale)] = {"pipeline": pipeline, "api": api}
+        print_scale(scale, pipeline, api)
+
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+    print(f"\nWrote {output}")
+
+
+def print_scale(scale, pipeline, api):
+    print(f"\n== x{scale}: {pipeline['rows']} rows, pipeline peak {pipeline['peak_rss_mib']} MiB, "
+          f"api peak {api['peak_rss_mib']} MiB")
+    print(f"{'stage':<20} {'seconds':>9} {'rows/s':>11}")
+    for stage, totals in pipeline["stages"].items():
+        print(f"{stage:<20} {totals['seconds']:>9.3f} {totals['rows_per_sec'] or 0:>11}")
+    warmup = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in api["warmup_seconds"].items())
+    print(f"\nAPI warm-up: {warmup}")
+    print(f"{'route':<26} {'status':>6} {'p50 ms':>8} {'p95 ms':>8} {'cached p50':>11}")
+    for case, route in api["routes"].items():
+        print(f"{case:<26} {route['status']:>6} {route['p50_ms']:>8.2f} {route['p95_ms']:>8.2f} {route['cached_p50_ms']:>11.2f}")
+    if api["uncovered_endpoints"]:
+        print(f"Not benchmarked: {', '.join(api['uncovered_endpoints'])}")
+    # A ?stream=1 case measures nothing new if the route ignores stream
+    unstreamed = [case for case, route in api["routes"].items() if "stream=1" in route["path"] and not route["streamed"]]
+    if unstreamed:
+        print(f"Not streamed: {', '.join(unstreamed)}")
+
+
+def compare(old_path, new_path):
+    with open(old_path, encoding="utf-8") as file:
+        old = json.load(file)
+    with open(new_path, encoding="utf-8") as file:
+        new = json.load(file)
+
+    def change(a, b):
+        return f"{b / a:.2f}x" if a else "-"
+
+    print(f"{old.get('commit')} -> {new.get('commit')}")
+    for scale in sorted(set(old["scales"]) & set(new["scales"]), key=int):
+        before, after = old["scales"][scale], new["scales"][scale]
+        print(f"\n== x{scale}")
+        print(f"{'stage':<20} {'old s':>9} {'new s':>9} {'change':>8}")
+        for stage, totals in after["pipeline"]["stages"].items():
+            previous = before["pipeline"]["stages"].get(stage)
+            if previous:
+                print(f"{stage:<20} {previous['seconds']:>9.3f} {totals['seconds']:>9.3f} {change(previous['seconds'], totals['seconds']):>8}")
+        print(f"\n{'route':<26} {'old p50':>9} {'new p50':>9} {'change':>8} {'old p95':>9} {'new p95':>9}")
+        for case, route in after["api"]["routes"].items():
+            previous = before["api"]["routes"].get(case)
+            if previous:
+                print(f"{case:<26} {previous['p50_ms']:>9.2f} {route['p50_ms']:>9.2f} {change(previous['p50_ms'], route['p50_ms']):>8} "
+                      f"{previous['p95_ms']:>9.2f} {route['p95_ms']:>9.2f}")
+        for label in ("pipeline", "api"):
+            print(f"{label} peak RSS: {before[label]['peak_rss_mib']} -> {after[label]['peak_rss_mib']} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the cleaning pipeline and the API")
+    parser.add_argument("--scales", default=DEFAULT_SCALES, help="comma-separated multiples of the real data")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS, help="requests per route")
+    parser.add_argument("--output", default="bench_results.json", help="where to write the results")
+    parser.add_argument("--workdir", help="keep the synthetic data here instead of a temporary folder")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    # Internal: the measurements that run in child processes
+    parser.add_argument("--pipeline-worker", nargs=3, help=argparse.SUPPRESS)
+    parser.add_argument("--p2p-html-worker", help=argparse.SUPPRESS)
+    parser.add_argument("--api-worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.pipeline_worker:
+        workdir, scale, p2p_table = args.pipeline_worker
+        print(json.dumps(pipeline_worker(workdir, int(scale), p2p_table)))
+    elif args.p2p_html_worker:
+        print(json.dumps(p2p_html_worker(args.p2p_html_worker)))
+    elif args.api_worker:
+        print(json.dumps(api_worker(args.api_worker)))
+    elif args.compare:
+        compare(*args.compare)
+    else:
+        scales = [int(scale) for scale in args.scales.split(",")]
+        output = os.path.abspath(args.output)
+        if args.workdir:
+            os.makedirs(args.workdir, exist_ok=True)
+            run_suite(scales, args.iterations, output, os.path.abspath(args.workdir))
+        else:
+            with tempfile.TemporaryDirectory() as workdir:
+                run_suite(scales, args.iterations, output, workdir)
+
+
+if __name__ == "__main__":
+    main()
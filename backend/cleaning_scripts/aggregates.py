@@ -0,0 +1,241 @@
+import json
+import os
+from bisect import bisect_left, bisect_right
+
+import pandas as pd
+
+try:
+    from .file_io import write_json
+except ImportError:
+    from file_io import write_json
+
+# Per-candidate aggregate bundle: every summary the API serves, computed in
+# one pass over the typed combined contributions frame. The pipeline writes it
+# to output/<candidate>_aggregates.json; the API serves it as-is and only
+# recomputes (with this same module) when the bundle does not match the data.
+
+AGGREGATES_VERSION = 4
+TOP_N = 10
+TOP_REPEAT_DONOR_MONTHS = 5
+
+# Time series are kept per day, week (Monday to Sunday) and month. Periods are
+# labelled by their first day as YYYY-MM-DD, with empty periods filled in.
+TIMESERIES_FREQUENCIES = {"day": "D", "week": "W", "month": "M"}
+
+
+def aggregates_path(folder, candidate):
+    return os.path.join(folder, f"{candidate}_aggregates.json")
+
+
+def to_records(df):
+    # JSON has no NaN; missing values become null
+    return df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+
+# Total given per contributor, grouped on the resolved ContributorID and
+# labelled with the first spelling of the name seen in the data
+def contributor_totals(df):
+    return (
+        df.groupby("ContributorID")
+        .agg(ContributorName=("ContributorName", "first"), ContributionAmount=("ContributionAmount", "sum"))
+        .reset_index()
+    )
+
+
+def repeated_contributor_totals(df, top_n=TOP_N):
+    counts = df.groupby("ContributorID").size()
+    repeated_df = df[df["ContributorID"].isin(counts[counts > 1].index)]
+
+    summary = contributor_totals(repeated_df).drop(columns="ContributorID")
+    summary = summary.rename(columns={"ContributionAmount": "TotalAmount"})
+    return summary.sort_values(by="TotalAmount", ascending=False).head(top_n)
+
+
+def top_contributors(df, top_n=TOP_N):
+    grouped = (
+        contributor_totals(df)
+        .sort_values("ContributionAmount", ascending=False)
+        .head(top_n)
+    )
+    return grouped.merge(
+        df[["ContributorID", "Employer", "Donor_City"]].drop_duplicates("ContributorID"),
+        on="ContributorID",
+        how="left"
+    ).drop(columns="ContributorID")
+
+
+def top_totals(df, column, key=None, top_n=TOP_N):
+    # Totals per value of column or, given a key column (EmployerID), per key
+    # labelled with the first value of column seen for it
+    df = df[df[column].notna()]
+    if key is None:
+        totals = df.groupby(column, observed=True)["ContributionAmount"].sum()
+    else:
+        totals = (
+            df.groupby(key)
+            .agg(**{column: (column, "first"), "ContributionAmount": ("ContributionAmount", "sum")})
+            .set_index(column)["ContributionAmount"]
+        )
+    return totals.sort_values(ascending=False).head(top_n).reset_index()
+
+
+def group_totals(df):
+    return df.groupby("ContributorGroup", observed=True)["ContributionAmount"].sum().reset_index()
+
+
+# Pivoted series: {"periods": [...], "series": {name: {measure: [...]}}},
+# one value per period in every list
+def period_labels(periods):
+    return periods.start_time.strftime("%Y-%m-%d").tolist()
+
+
+def fill_periods(table, freq):
+    # Reindex a period-indexed table onto every period between its first and last
+    if table.empty:
+        return table
+    full = pd.period_range(table.index.min(), table.index.max(), freq=freq)
+    return table.reindex(full, fill_value=0)
+
+
+def resample_totals(df, freq):
+    # Totals and counts per period, split by ContributorGroup
+    dated = df[df["ContributionDate"].notna()]
+    periods = dated["ContributionDate"].dt.to_period(freq).rename("Period")
+    grouped = (
+        dated.groupby([periods, dated["ContributorGroup"]], observed=True)["ContributionAmount"]
+        .agg(["sum", "size"])
+    )
+    amounts = fill_periods(grouped["sum"].unstack(fill_value=0), freq)
+    counts = fill_periods(grouped["size"].unstack(fill_value=0), freq)
+
+    return {
+        "periods": period_labels(amounts.index),
+        "series": {
+            str(group): {"amount": amounts[group].round(2).tolist(), "count": counts[group].astype(int).tolist()}
+            for group in amounts.columns
+        },
+        "total": {
+            "amount": amounts.sum(axis=1).round(2).tolist(),
+            "count": counts.sum(axis=1).astype(int).tolist(),
+        },
+    }
+
+
+def timeseries(df):
+    return {name: resample_totals(df, freq) for name, freq in TIMESERIES_FREQUENCIES.items()}
+
+
+def period_start(date, freq):
+    # First day of the period containing date; raises ValueError for bad dates
+    return pd.Period(pd.Timestamp(date), freq=freq).start_time.strftime("%Y-%m-%d")
+
+
+def slice_series(pivoted, freq, start=None, end=None):
+    # Periods overlapping [start, end], either bound optional
+    periods = pivoted["periods"]
+    lo = 0 if start is None else bisect_left(periods, period_start(start, freq))
+    hi = len(periods) if end is None else bisect_right(periods, period_start(end, freq))
+
+    sliced = {
+        "periods": periods[lo:hi],
+        "series": {
+            name: {measure: values[lo:hi] for measure, values in measures.items()}
+            for name, measures in pivoted["series"].items()
+        },
+    }
+    if "total" in pivoted:
+        sliced["total"] = {measure: values[lo:hi] for measure, values in pivoted["total"].items()}
+    return sliced
+
+
+def repeat_donor_months(df, top_n=TOP_REPEAT_DONOR_MONTHS):
+    # Donations per month by the individual donors who gave in the most months
+    df = df.dropna(subset=["ContributionDate", "First_Name", "Last_Name"])
+    months = df["ContributionDate"].dt.to_period("M").rename("Period")
+    counts = df.groupby([df["ContributorID"], months]).size().unstack(fill_value=0)
+    if counts.empty:
+        return {"periods": [], "series": {}}
+
+    top_donors = (counts > 0).sum(axis=1).sort_values(ascending=False).head(top_n).index
+    counts = counts.loc[top_donors]
+    counts = fill_periods(counts.loc[:, counts.any()].T, "M")
+
+    names = df.drop_duplicates("ContributorID").set_index("ContributorID")["ContributorName"]
+    return {
+        "periods": period_labels(counts.index),
+        "series": {
+            names[donor]: {"count": counts[donor].astype(int).tolist()}
+            for donor in counts.columns
+        },
+    }
+
+
+def total_donations(df):
+    # Rows are deduplicated when the combined file is built (deduplication.py),
+    # so every summary sums the same rows
+    return round(float(df["ContributionAmount"].sum()), 2)
+
+
+def shared_donor_counts(df):
+    # Number of donors (by ContributorID) each pair of candidates has in common;
+    # the diagonal is each candidate's own donor count
+    membership = pd.crosstab(df["ContributorID"], df["Candidate"]).clip(upper=1)
+    shared = membership.T.dot(membership)
+    return {str(a): {str(b): int(shared.loc[a, b]) for b in shared.columns} for a in shared.index}
+
+
+def build_comparison(df):
+    # Side-by-side summary of every candidate in the stacked frame. Totals
+    # match each candidate's total_donations and group totals /api/contributions.
+    by_candidate = df.groupby("Candidate", observed=True)
+    totals = by_candidate["ContributionAmount"].sum().round(2)
+    summary = pd.DataFrame({
+        "total_donations": totals,
+        "contribution_count": by_candidate.size(),
+        "donor_count": by_candidate["ContributorID"].nunique(),
+        "median_gift": by_candidate["ContributionAmount"].median().round(2),
+    })
+    groups = (
+        df.groupby(["Candidate", "ContributorGroup"], observed=True)["ContributionAmount"]
+        .sum()
+        .round(2)
+    )
+
+    candidates = []
+    for candidate, row in zip(summary.index, to_records(summary)):
+        row["contribution_count"] = int(row["contribution_count"])
+        row["donor_count"] = int(row["donor_count"])
+        candidates.append({"candidate": str(candidate), **row, "groups": groups.loc[candidate].to_dict()})
+
+    return {"candidates": candidates, "shared_donors": shared_donor_counts(df)}
+
+
+def build_aggregates(df, source_sha256):
+    return {
+        "version": AGGREGATES_VERSION,
+        "source_sha256": source_sha256,
+        "group_totals": to_records(group_totals(df)),
+        "top_donors": to_records(top_contributors(df)),
+        "top_employers": to_records(top_totals(df, "Employer", key="EmployerID")),
+        "top_occupations": to_records(top_totals(df, "Occupation")),
+        "repeat_donors": to_records(repeated_contributor_totals(df)),
+        "repeat_donor_months": repeat_donor_months(df),
+        "timeseries": timeseries(df),
+        "total_donations": total_donations(df),
+    }
+
+
+def write_aggregates(bundle, path):
+    write_json(bundle, path)
+
+
+def load_aggregates(path, source_sha256):
+    # Returns the bundle only if it was built from exactly this data version
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            bundle = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if bundle.get("version") != AGGREGATES_VERSION or bundle.get("source_sha256") != source_sha256:
+        return None
+    return bundle
@@ -0,0 +1,58 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+try:
+    from .file_io import file_sha256, write_json
+except ImportError:
+    from file_io import file_sha256, write_json
+
+# Records what each build step was produced from, so update_all_donations can
+# skip steps whose inputs have not changed since the last run. A step is
+# fresh when its recorded input fingerprints match and its outputs still exist.
+
+MANIFEST_VERSION = 1
+
+
+def file_fingerprint(path):
+    if path is None or not os.path.exists(path):
+        return None
+    return file_sha256(path)
+
+
+def value_fingerprint(value):
+    encoded = json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class BuildManifest:
+    def __init__(self, path):
+        self.path = path
+        self.steps = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as file:
+                    data = json.load(file)
+                if data.get("version") == MANIFEST_VERSION:
+                    self.steps = data.get("steps", {})
+            except (OSError, ValueError):
+                self.steps = {}  # Unreadable manifest: rebuild everything
+
+    def is_fresh(self, step, inputs, outputs):
+        recorded = self.steps.get(step)
+        return (
+            recorded is not None
+            and recorded.get("inputs") == inputs
+            and all(os.path.exists(path) for path in outputs)
+        )
+
+    def record(self, step, inputs, outputs):
+        self.steps[step] = {
+            "inputs": inputs,
+            "outputs": list(outputs),
+            "built_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+
+    def save(self):
+        write_json({"version": MANIFEST_VERSION, "steps": self.steps}, self.path, indent=2, sort_keys=True)
@@ -1,12 +1,37 @@
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import re
 import os
 from difflib import get_close_matches
 
+try:
+    from . import aggregates, charts, combined_contributions, contributor_names, deduplication, entity_resolution, overlap
+    from .aggregates import aggregates_path, build_aggregates, write_aggregates
+    from .build_manifest import BuildManifest, file_fingerprint, value_fingerprint
+    from .charts import chart_paths, render_charts
+    from .combined_contributions import columnar_path, load_combined_contributions, parse_contribution_dates, read_combined_rows, write_columnar, write_csv
+    from .overlap import build_overlap, overlap_path, write_overlap
+    from .contributor_names import add_contributor_columns, business_keywords
+    from .deduplication import deduplicate_contributions
+    from .entity_resolution import ENTITY_ID_COLUMNS, add_entity_ids_across
+    from .p2p_contributions import load_p2p_contributions, p2p_table_file, resolve_p2p_source
+    from .stage_timings import report_timings, stage, timed_stage
+except ImportError:
+    import aggregates, charts, combined_contributions, contributor_names, deduplication, entity_resolution, overlap
+    from aggregates import aggregates_path, build_aggregates, write_aggregates
+    from build_manifest import BuildManifest, file_fingerprint, value_fingerprint
+    from charts import chart_paths, render_charts
+    from combined_contributions import columnar_path, load_combined_contributions, parse_contribution_dates, read_combined_rows, write_columnar, write_csv
+    from overlap import build_overlap, overlap_path, write_overlap
+    from contributor_names import add_contributor_columns, business_keywords
+    from deduplication import deduplicate_contributions
+    from entity_resolution import ENTITY_ID_COLUMNS, add_entity_ids_across
+    from p2p_contributions import load_p2p_contributions, p2p_table_file, resolve_p2p_source
+    from stage_timings import report_timings, stage, timed_stage
+
 # Paths
 data_dir = os.path.join(os.path.dirname(__file__), "candidate_contributions")
-p2p_file = os.path.join(data_dir, "Combined_P2P_Contributions.xlsx")
+p2p_file = p2p_table_file
 
 # Candidate files (from the original script)
 candidate_files = {
@@ -17,6 +42,15 @@ candidate_files = {
     "Bill O'Dea": os.path.join(data_dir, "WilliamODeaContributions.csv"),
 }
 
+# Define accepted exact recipient name aliases per candidate
+candidate_recipient_names = {
+    "Mussab Ali": ["Mussab Ali", "Ali for Mayor", "Friends of Mussab Ali", "Mussab Ali for Mayor"],
+    "Joyce Watterman": ["Joyce Watterman", "Joyne E. Watterman", "Joyce E. Watterman", "Joyce Watterman for Mayor"],
+    "Jim McGreevey": ["Jim McGreevey for Mayor", "Jim McGreevey for Mayor Inc, Jersey City", "Jim McGreevey", "Jim McGreevey for Mayor, Inc.", "Jim McGreevey for Mayor, Inc"],
+    "James Solomon": ["James Solomon", "Solomon for Jersey City", "Solomon for Mayor", "Soloman for Jersey City", "Team Soloman", "Team Solomon"],
+    "Bill O'Dea": ["Bill O'Dea", "Bill O'Dea Election Fund", "Bill O'Dea for Mayor", "O'Dea for Mayor"]
+}
+
 type_mapping = {
     "INDIVIDUAL": "Individual",
     "BUSINESS/CORP": "Corporate",
@@ -36,34 +70,51 @@ type_mapping = {
     "P2P_CORPORATE": "P2P Corporate"
 }
 
-business_keywords = r"\b(LLC|INC|PC|CORP|CORPORATION|L\.L\.C\.|L\.P\.|LP|CO\.|COMPANY|INDUSTRIES|GROUP|ENTERPRISES|ASSOCIATES|SERVICES|PARTNERS|HOLDINGS)\b"
+# Individual gifts are bucketed by amount: below the first threshold is small,
+# below the second is medium, anything else is large
+individual_size_thresholds = (500, 2000)
+individual_size_labels = ["Individual - Small", "Individual - Medium", "Individual - Large"]
+
+def bucket_individual_amounts(amounts, thresholds=None):
+    thresholds = thresholds or individual_size_thresholds
+    bins = [-np.inf, *thresholds, np.inf]
+    return pd.cut(amounts, bins=bins, labels=individual_size_labels, right=False).astype(object)
+
+def split_individual_groups(groups, amounts, individual_group, thresholds=None):
+    sizes = bucket_individual_amounts(amounts, thresholds)
+    return groups.where(groups != individual_group, sizes)
+
+@timed_stage
+def classify_contributors(contributor_types, amounts, thresholds=None):
+    groups = contributor_types.map(type_mapping).fillna("Other")
+    return split_individual_groups(groups, amounts, "Individual", thresholds)
+
+@timed_stage
+def classify_p2p_contributors(contributor_names, business_names, amounts, thresholds=None):
+    # A P2P contributor is corporate when it is the vendor itself and looks like a business
+    is_corporate = (contributor_names == business_names) & contributor_names.str.contains(
+        business_keywords, case=False, na=False
+    )
+    groups = pd.Series(
+        np.where(is_corporate, "P2P Corporate", "P2P Individual"),
+        index=contributor_names.index, dtype=object
+    )
+    return split_individual_groups(groups, amounts, "P2P Individual", thresholds)
 
-def get_individual_csv_data(file_path):
+@timed_stage
+def get_individual_csv_data(file_path, thresholds=None):
     df = pd.read_csv(file_path)
 
-    df["ContributorGroup"] = df["ContributorType"].map(type_mapping).fillna("Other")
-
-    def split_individual(row):
-        if row["ContributorGroup"] == "Individual":
-            amount = row["ContributionAmount"]
-            if amount < 500:
-                return "Individual - Small"
-            elif 500 <= amount < 2000:
-                return "Individual - Medium"
-            else:
-                return "Individual - Large"
-        else:
-            return row["ContributorGroup"]
-
-    df["ContributorGroup"] = df.apply(split_individual, axis=1)
-    
     # Ensure 'ContributionAmount' is numeric, coercing errors to NaN
     df['ContributionAmount'] = pd.to_numeric(df['ContributionAmount'], errors='coerce')
     df.dropna(subset=['ContributionAmount'], inplace=True) # Drop rows where conversion failed
 
+    df["ContributorGroup"] = classify_contributors(df["ContributorType"], df["ContributionAmount"], thresholds)
+    df["Source"] = "ELEC"
+
     return df[[
         "ContributorGroup", "ContributionAmount", "FirstName", "LastName", "NonIndName",
-        "ContributionDate", "EmpName", "OccupationName", "City", "State"
+        "ContributionDate", "EmpName", "OccupationName", "City", "State", "Source"
     ]].rename(columns={
         "FirstName": "First_Name",
         "LastName": "Last_Name",
@@ -74,53 +125,30 @@ def get_individual_csv_data(file_path):
         "State": "Donor_State"
     })
 
-def get_p2p_contributions(file_path, candidate_name):
-    df = pd.read_excel(file_path)
-
-    # Define accepted exact recipient name aliases per candidate
-    candidate_recipient_names = {
-        "Mussab Ali": ["Mussab Ali", "Ali for Mayor", "Friends of Mussab Ali", "Mussab Ali for Mayor"],
-        "Joyce Watterman": ["Joyce Watterman", "Joyne E. Watterman", "Joyce E. Watterman", "Joyce Watterman for Mayor"],
-        "Jim McGreevey": ["Jim McGreevey for Mayor", "Jim McGreevey for Mayor Inc, Jersey City", "Jim McGreevey", "Jim McGreevey for Mayor, Inc.", "Jim McGreevey for Mayor, Inc"],
-        "James Solomon": ["James Solomon", "Solomon for Jersey City", "Solomon for Mayor", "Soloman for Jersey City", "Team Soloman", "Team Solomon"],
-        "Bill O'Dea": ["Bill O'Dea", "Bill O'Dea Election Fund", "Bill O'Dea for Mayor", "O'Dea for Mayor"]
-    }
+@timed_stage
+def get_p2p_contributions(p2p_data, candidate_name, thresholds=None):
+    # p2p_data is the combined P2P table, already loaded by load_p2p_contributions
+    # (shared across candidates), or a path to load it from
+    df = p2p_data if isinstance(p2p_data, pd.DataFrame) else load_p2p_contributions(p2p_data)
 
     valid_names = [name.lower() for name in candidate_recipient_names.get(candidate_name, [])]
-    df["Recipient_Name"] = df["Recipient_Name"].astype(str).str.lower()
+    recipients = df["Recipient_Name"].astype(str).str.lower()
 
-    df = df[df["Recipient_Name"].isin(valid_names)].copy()
+    df = df[recipients.isin(valid_names)].copy()
 
     df["Contributor_Name"] = df["Contributor_Name"].astype(str).str.strip().str.title()
     df["Business_Name"] = df["Business_Name"].astype(str).str.strip().str.title()
     df["Employer"] = df["Business_Name"]
 
-    df["ContributorMatchesBusiness"] = df["Contributor_Name"] == df["Business_Name"]
-    df["HasBusinessKeywords"] = df["Contributor_Name"].str.contains(business_keywords, case=False, na=False)
-
-    df["ContributorGroup"] = df.apply(
-        lambda row: "P2P Corporate" if row["ContributorMatchesBusiness"] and row["HasBusinessKeywords"]
-        else "P2P Individual", axis=1
-    )
-
-    # Re-classify P2P Individuals into Individual - Small/Medium/Large
-    def classify_p2p_individual(row):
-        if row["ContributorGroup"] == "P2P Individual":
-            amount = row["Contribution_Amount"]
-            if amount < 500:
-                return "Individual - Small"
-            elif 500 <= amount < 2000:
-                return "Individual - Medium"
-            else:
-                return "Individual - Large"
-        return row["ContributorGroup"]
-
-    df["ContributorGroup"] = df.apply(classify_p2p_individual, axis=1)
-    
     # Ensure 'Contribution_Amount' is numeric
     df['Contribution_Amount'] = pd.to_numeric(df['Contribution_Amount'], errors='coerce')
     df.dropna(subset=['Contribution_Amount'], inplace=True) # Drop rows where conversion failed
 
+    # P2P Individuals are re-classified into Individual - Small/Medium/Large
+    df["ContributorGroup"] = classify_p2p_contributors(
+        df["Contributor_Name"], df["Business_Name"], df["Contribution_Amount"], thresholds
+    )
+
 
     df = df.rename(columns={
         "Contributor_Name": "Name",
@@ -139,102 +167,250 @@ def get_p2p_contributions(file_path, candidate_name):
     df["First_Name"] = None
     df["Last_Name"] = None
     df["Occupation"] = None
+    df["Source"] = "P2P"
 
     return df[[
         "ContributorGroup", "ContributionAmount", "First_Name", "Last_Name",
-        "Business_Name", "ContributionDate", "Employer", "Occupation", "Donor_City", "Donor_State"
+        "Business_Name", "ContributionDate", "Employer", "Occupation", "Donor_City", "Donor_State", "Source"
     ]]
 
-def plot_type_breakdown_pie(df, candidate):
-    grouped = df.groupby("ContributorGroup")["ContributionAmount"].sum()
-    labels = grouped.index.tolist()
-    values = grouped.values
-    total = values.sum()
-
-    color_map = {
-        "Individual - Small": "#66b3ff",
-        "Individual - Medium": "#3399ff",
-        "Individual - Large": "#004080",
-        "Corporate": "#ff9999",
-        "P2P Individual": "#33cc99",  # Not used anymore
-        "P2P Corporate": "#ff6666",
-        "Union": "#99ff99",
-        "Political Committee": "#ffcc99",
-        "Interest Group": "#c2c2f0",
-        "Candidate": "#ffb3e6",
-        "Other": "#d3d3d3",
-        "Unknown": "#bbbbbb"
+def combine_sources(df_csv, df_p2p, candidate):
+    # One frame of the candidate's ELEC and P2P rows with contributor identity,
+    # each gift counted once (see deduplication.py). Entity IDs are added
+    # across every candidate by resolve_candidate_entities.
+    combined_df = pd.concat([df_csv, df_p2p], ignore_index=True)
+    with stage("contributor_names"):
+        combined_df = add_contributor_columns(combined_df)
+    with stage("deduplication"):
+        rows = len(combined_df)
+        combined_df = deduplicate_contributions(combined_df, parse_contribution_dates(combined_df["ContributionDate"]))
+    if len(combined_df) < rows:
+        print(f"🧹 Dropped {rows - len(combined_df)} duplicate contributions for {candidate}")
+    return combined_df
+
+@timed_stage
+def resolve_candidate_entities(rebuilt, candidate_paths):
+    # Resolves ContributorID/EmployerID over every candidate at once, so a
+    # donor has one ID in every combined file and in the overlap. rebuilt
+    # maps candidates to the combined rows built this run; the others are
+    # read back from their files, since new names can regroup their donors.
+    # Writes every rebuilt file and every other file whose IDs changed, and
+    # returns the resolved frames by candidate.
+    frames = {
+        candidate: rebuilt[candidate] if candidate in rebuilt else read_combined_rows(path)
+        for candidate, path in candidate_paths.items()
+        if candidate in rebuilt or os.path.exists(path)
     }
-    colors = [color_map.get(label, "#dddddd") for label in labels]
-
-    plt.figure(figsize=(7,7))
-    wedges, _, autotexts = plt.pie(
-        values, labels=None, autopct='%1.1f%%', startangle=140,
-        colors=colors, textprops={'fontsize': 12}
-    )
-    plt.title(f"{candidate}\nTotal Donations: ${total:,.2f}", fontsize=16)
-    plt.legend(wedges, labels, title="Contributor Types", loc="center left", bbox_to_anchor=(1, 0, 0.5, 1), fontsize=12)
-    plt.tight_layout()
-    plt.savefig(f"visuals/{candidate.replace(' ', '_')}_contributions_pie.png")
-    plt.close()
-
+    resolved = add_entity_ids_across(frames)
+    for candidate, df in resolved.items():
+        previous = frames[candidate]
+        unchanged = candidate not in rebuilt and all(
+            column in previous.columns and previous[column].equals(df[column]) for column in ENTITY_ID_COLUMNS
+        )
+        if not unchanged:
+            write_csv(df, candidate_paths[candidate])
+    return resolved
+
+@timed_stage
 def get_top_contributors(df, candidate):
     top_donors = df.copy()
-    top_donors["ContributorName"] = top_donors.apply(
-        lambda row: f"{row['First_Name']} {row['Last_Name']}".strip()
-        if row["First_Name"] or row["Last_Name"]
-        else row["Business_Name"] or "Unknown", axis=1
+
+    # Group on the resolved contributor and employer IDs, label each group with its first spelling
+    top_contributors = (
+        top_donors.groupby("ContributorID")
+        .agg(ContributorName=("ContributorName", "first"), ContributionAmount=("ContributionAmount", "sum"))
+        .nlargest(10, "ContributionAmount")
+        .reset_index(drop=True)
     )
+    top_employers = (
+        top_donors.groupby("EmployerID")
+        .agg(Employer=("Employer", "first"), ContributionAmount=("ContributionAmount", "sum"))
+        .nlargest(10, "ContributionAmount")
+        .reset_index(drop=True)
+    )
+    top_occupations = top_donors.groupby("Occupation", observed=True)["ContributionAmount"].sum().nlargest(10).reset_index()
+
+    write_csv(top_contributors, f"output/{candidate.replace(' ', '_')}_top_donors.csv")
+    write_csv(top_employers, f"output/{candidate.replace(' ', '_')}_top_employers.csv")
+    write_csv(top_occupations, f"output/{candidate.replace(' ', '_')}_top_occupations.csv")
+
+@timed_stage
+def write_candidate_aggregates(df, candidate):
+    # Re-read the CSV as written so the bundle is typed exactly like the API's
+    # frame and carries the hash the API checks it against
+    slug = candidate.replace(' ', '_')
+    typed_df, source_sha256 = load_combined_contributions(f"output/{slug}_combined_contributions.csv")
+    write_aggregates(build_aggregates(typed_df, source_sha256), aggregates_path("output", slug))
+
+@timed_stage
+def write_candidate_columnar(df, candidate):
+    # Typed copy of the combined CSV for the API, tagged with the CSV's hash
+    combined_path = f"output/{candidate.replace(' ', '_')}_combined_contributions.csv"
+    typed_df, source_sha256 = load_combined_contributions(combined_path)
+    if not write_columnar(typed_df, source_sha256, columnar_path(combined_path)):
+        print(f"⚠️ pyarrow is not installed, the API will read the CSV for {candidate}")
+
+def combined_outputs(folder="output"):
+    # Every combined contributions file the API serves, by candidate slug
+    suffix = "_combined_contributions.csv"
+    return {
+        filename[:-len(suffix)]: os.path.join(folder, filename)
+        for filename in sorted(os.listdir(folder))
+        if filename.endswith(suffix)
+    }
+
+@timed_stage
+def write_donor_overlap(combined_paths):
+    frames = []
+    sources = {}
+    for slug, path in combined_paths.items():
+        df, sources[slug] = load_combined_contributions(path)
+        frames.append(df.assign(Candidate=slug))
+    # The stored IDs were resolved across all candidates, so they already agree
+    stacked = pd.concat(frames, ignore_index=True)
+    write_overlap(build_overlap(stacked), sources, overlap_path("output"))
+
+manifest_file = os.path.join("output", "build_manifest.json")
+
+def candidate_artifacts(candidate, chart_dir=None):
+    slug = candidate.replace(' ', '_')
+    return {
+        "combined": [f"output/{slug}_combined_contributions.csv"],
+        "charts": list(chart_paths(slug, chart_dir).values()),
+        "top_contributors": [
+            f"output/{slug}_top_donors.csv",
+            f"output/{slug}_top_employers.csv",
+            f"output/{slug}_top_occupations.csv",
+        ],
+        "aggregates": [aggregates_path("output", slug)],
+        "columnar": [columnar_path(f"output/{slug}_combined_contributions.csv")],
+    }
+
+def config_fingerprint():
+    # Anything that changes how rows are cleaned or classified invalidates every build
+    sources = [
+        __file__, contributor_names.__file__, deduplication.__file__, entity_resolution.__file__,
+        aggregates.__file__, combined_contributions.__file__,
+    ]
+    return value_fingerprint({
+        "type_mapping": type_mapping,
+        "business_keywords": business_keywords,
+        "individual_size_thresholds": individual_size_thresholds,
+        "individual_size_labels": individual_size_labels,
+        "candidate_recipient_names": candidate_recipient_names,
+        "sources": [file_fingerprint(path) for path in sources],
+    })
 
-    top_contributors = top_donors.groupby("ContributorName")["ContributionAmount"].sum().nlargest(10).reset_index()
-    top_employers = top_donors.groupby("Employer")["ContributionAmount"].sum().nlargest(10).reset_index()
-    top_occupations = top_donors.groupby("Occupation")["ContributionAmount"].sum().nlargest(10).reset_index()
-
-    top_contributors.to_csv(f"output/{candidate.replace(' ', '_')}_top_donors.csv", index=False)
-    top_employers.to_csv(f"output/{candidate.replace(' ', '_')}_top_employers.csv", index=False)
-    top_occupations.to_csv(f"output/{candidate.replace(' ', '_')}_top_occupations.csv", index=False)
-
-def plot_contributions_over_time(df, candidate):
-    df = df.copy()
-    df = df.dropna(subset=["ContributionDate"])
-    df["ContributionDate"] = pd.to_datetime(df["ContributionDate"], errors="coerce")
-    df = df.dropna(subset=["ContributionDate"])
-
-    time_series = df.groupby(df["ContributionDate"].dt.to_period("M"))["ContributionAmount"].sum()
-    time_series.index = time_series.index.to_timestamp()
-
-    plt.figure(figsize=(10, 6))
-    plt.plot(time_series.index, time_series.values, marker="o", color="#27ae60")
-    plt.title(f"{candidate} - Monthly Total Donations Over Time", fontsize=16)
-    plt.xlabel("Date")
-    plt.ylabel("Total Contributions ($)")
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(f"visuals/{candidate.replace(' ', '_')}_line_donations_over_time.png")
-    plt.close()
-
-def update_all_donations():
-    os.makedirs("visuals", exist_ok=True)
+def update_all_donations(force=False, chart_dir=None, chart_workers=None):
     os.makedirs("output", exist_ok=True)
 
+    manifest = BuildManifest(manifest_file)
+    config_hash = config_fingerprint()
+    # Fingerprint the typed table, converting the workbook first when it has
+    # none yet, so the first run and the next ones hash the same file (a merge
+    # of parsed HTML years changes the table but not the workbook)
+    p2p_df = None
+    p2p_source = resolve_p2p_source(p2p_file)
+    if p2p_source is not None and p2p_source.endswith(".xlsx"):
+        p2p_df = load_p2p_contributions(p2p_file)
+        p2p_source = resolve_p2p_source(p2p_file)
+    p2p_hash = file_fingerprint(p2p_source)
+
+    candidate_paths = {candidate: candidate_artifacts(candidate)["combined"][0] for candidate in candidate_files}
+    combined_inputs = {}
+    rebuilt = {}
+
     for candidate, file_path in candidate_files.items():
-        df_csv = get_individual_csv_data(file_path)
-        df_p2p = get_p2p_contributions(p2p_file, candidate)
+        # Combined contributions depend on the candidate CSV, the P2P table and the config
+        inputs = {"contributions": file_fingerprint(file_path), "p2p": p2p_hash, "config": config_hash}
+        combined_inputs[candidate] = inputs
+        if not force and manifest.is_fresh(f"{candidate}/combined", inputs, [candidate_paths[candidate]]):
+            print(f"⏭️ Skipping combined contributions for {candidate}: inputs unchanged")
+            continue
 
-        combined_df = pd.concat([df_csv, df_p2p], ignore_index=True)
-        combined_df.to_csv(f"output/{candidate.replace(' ', '_')}_combined_contributions.csv", index=False)
+        if p2p_df is None:
+            # Load the P2P table once and share it across candidates
+            p2p_df = load_p2p_contributions(p2p_file)
 
-        print(f"\nContribution Type Breakdown for {candidate}:")
-        print(combined_df.groupby("ContributorGroup")["ContributionAmount"].sum())
+        df_csv = get_individual_csv_data(file_path)
+        df_p2p = get_p2p_contributions(p2p_df, candidate)
+        rebuilt[candidate] = combine_sources(df_csv, df_p2p, candidate)
 
-        plot_type_breakdown_pie(combined_df, candidate)
-        plot_contributions_over_time(combined_df, candidate)
-        get_top_contributors(combined_df, candidate)
+        print(f"\nContribution Type Breakdown for {candidate}:")
+        print(rebuilt[candidate].groupby("ContributorGroup")["ContributionAmount"].sum())
+
+    # Entity IDs span every candidate: when any candidate's rows change, the
+    # others are resolved again with them and rewritten if their IDs moved
+    inputs = {"combined": combined_inputs, "config": config_hash}
+    resolved = {}
+    if rebuilt or not manifest.is_fresh("entity_ids", inputs, list(candidate_paths.values())):
+        resolved = resolve_candidate_entities(rebuilt, candidate_paths)
+        for candidate in rebuilt:
+            manifest.record(f"{candidate}/combined", combined_inputs[candidate], [candidate_paths[candidate]])
+        manifest.record("entity_ids", inputs, list(candidate_paths.values()))
+        manifest.save()
+
+    for candidate in candidate_files:
+        artifacts = candidate_artifacts(candidate, chart_dir)
+        combined_path = artifacts["combined"][0]
+        combined_df = resolved.get(candidate)
+
+        # Top-N tables, the API's aggregate bundle and typed table only depend on the combined contributions
+        inputs = {"combined": file_fingerprint(combined_path), "config": config_hash}
+        steps = [
+            ("top_contributors", get_top_contributors),
+            ("aggregates", write_candidate_aggregates),
+            ("columnar", write_candidate_columnar),
+        ]
+        for step, build in steps:
+            if not force and manifest.is_fresh(f"{candidate}/{step}", inputs, artifacts[step]):
+                print(f"⏭️ Skipping {step} for {candidate}: combined contributions unchanged")
+                continue
+            if combined_df is None:
+                combined_df = load_combined_contributions(combined_path)[0]
+            build(combined_df, candidate)
+            manifest.record(f"{candidate}/{step}", inputs, artifacts[step])
+            manifest.save()
+
+    # Donor/employer overlap spans every candidate, so it is one step keyed on all combined files
+    combined_paths = combined_outputs()
+    inputs = {
+        "combined": {slug: file_fingerprint(path) for slug, path in combined_paths.items()},
+        "code": file_fingerprint(overlap.__file__),
+        "config": config_hash,
+    }
+    overlap_outputs = [overlap_path("output")]
+    if not force and manifest.is_fresh("overlap", inputs, overlap_outputs):
+        print("⏭️ Skipping donor overlap: combined contributions unchanged")
+    elif combined_paths:
+        write_donor_overlap(combined_paths)
+        manifest.record("overlap", inputs, overlap_outputs)
+        manifest.save()
+        print(f"🎯 Saved donor overlap across {len(combined_paths)} candidates")
+
+    # Charts are a separate stage: rendered from the aggregate bundles, across
+    # candidates in parallel, and only where the bundle or chart code changed
+    chart_code = file_fingerprint(charts.__file__)
+    chart_inputs = {}
+    for candidate in candidate_files:
+        artifacts = candidate_artifacts(candidate, chart_dir)
+        inputs = {"aggregates": file_fingerprint(artifacts["aggregates"][0]), "charts": chart_code}
+        if not force and manifest.is_fresh(f"{candidate}/charts", inputs, artifacts["charts"]):
+            print(f"⏭️ Skipping charts for {candidate}: aggregates unchanged")
+            continue
+        chart_inputs[candidate] = inputs
+
+    jobs = {candidate: candidate_artifacts(candidate)["aggregates"][0] for candidate in chart_inputs}
+    with stage("render_charts"):
+        rendered = render_charts(jobs, chart_dir, chart_workers)
+    for candidate in rendered:
+        manifest.record(f"{candidate}/charts", chart_inputs[candidate], candidate_artifacts(candidate, chart_dir)["charts"])
+    manifest.save()
+    report_timings(os.path.join("output", "stage_timings.json"))
 
 # --- Start of the specific code for Joyce Watterman ---
 
 if __name__ == "__main__":
-    os.makedirs("visuals", exist_ok=True)
     os.makedirs("output", exist_ok=True)
 
     candidate_name = "Joyce Watterman"
@@ -245,14 +421,17 @@ if __name__ == "__main__":
     df_csv = get_individual_csv_data(file_path)
     df_p2p = get_p2p_contributions(p2p_file, candidate_name)
 
-    combined_df = pd.concat([df_csv, df_p2p], ignore_index=True)
-    combined_df.to_csv(f"output/{candidate_name.replace(' ', '_')}_combined_contributions.csv", index=False)
+    combined_df = combine_sources(df_csv, df_p2p, candidate_name)
+    # Resolved with the other candidates' files, which are rewritten if their IDs move
+    candidate_paths = {candidate: candidate_artifacts(candidate)["combined"][0] for candidate in candidate_files}
+    combined_df = resolve_candidate_entities({candidate_name: combined_df}, candidate_paths)[candidate_name]
 
     print(f"\nContribution Type Breakdown for {candidate_name}:")
     print(combined_df.groupby("ContributorGroup")["ContributionAmount"].sum())
 
-    plot_type_breakdown_pie(combined_df, candidate_name)
-    plot_contributions_over_time(combined_df, candidate_name)
     get_top_contributors(combined_df, candidate_name)
+    write_candidate_aggregates(combined_df, candidate_name)
+    write_candidate_columnar(combined_df, candidate_name)
+    render_charts({candidate_name: candidate_artifacts(candidate_name)["aggregates"][0]}, workers=1)
 
     print(f"Data for {candidate_name} has been updated successfully.")
\ No newline at end of file
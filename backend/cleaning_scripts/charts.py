@@ -0,0 +1,121 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+import json
+import numpy as np
+import os
+import time
+
+# Static chart images, rendered from each candidate's aggregate bundle
+# (output/<candidate>_aggregates.json) rather than from the raw rows.
+# Figures are built with the object-oriented API on an Agg canvas, so no
+# pyplot state is shared and each candidate can render in its own process.
+
+chart_dir = os.environ.get("CHART_OUTPUT_DIR", os.path.join(os.path.dirname(__file__), "visuals"))
+
+color_map = {
+    "Individual - Small": "#66b3ff",
+    "Individual - Medium": "#3399ff",
+    "Individual - Large": "#004080",
+    "Corporate": "#ff9999",
+    "P2P Individual": "#33cc99",  # Not used anymore
+    "P2P Corporate": "#ff6666",
+    "Union": "#99ff99",
+    "Political Committee": "#ffcc99",
+    "Interest Group": "#c2c2f0",
+    "Candidate": "#ffb3e6",
+    "Other": "#d3d3d3",
+    "Unknown": "#bbbbbb"
+}
+
+
+def chart_paths(slug, folder=None):
+    folder = folder or chart_dir
+    return {
+        "pie": os.path.join(folder, f"{slug}_contributions_pie.png"),
+        "timeseries": os.path.join(folder, f"{slug}_line_donations_over_time.png"),
+    }
+
+
+def new_figure(figsize):
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def plot_type_breakdown_pie(bundle, candidate, path):
+    labels = [row["ContributorGroup"] for row in bundle["group_totals"]]
+    values = [row["ContributionAmount"] for row in bundle["group_totals"]]
+    total = sum(values)
+    colors = [color_map.get(label, "#dddddd") for label in labels]
+
+    fig = new_figure((7, 7))
+    ax = fig.subplots()
+    wedges, _, autotexts = ax.pie(
+        values, labels=None, autopct='%1.1f%%', startangle=140,
+        colors=colors, textprops={'fontsize': 12}
+    )
+    ax.set_title(f"{candidate}\nTotal Donations: ${total:,.2f}", fontsize=16)
+    ax.legend(wedges, labels, title="Contributor Types", loc="center left", bbox_to_anchor=(1, 0, 0.5, 1), fontsize=12)
+    fig.tight_layout()
+    fig.savefig(path)
+
+
+def plot_contributions_over_time(bundle, candidate, path):
+    monthly = bundle["timeseries"]["month"]
+    dates = np.array(monthly["periods"], dtype="datetime64[D]")
+
+    fig = new_figure((10, 6))
+    ax = fig.subplots()
+    ax.plot(dates, monthly["total"]["amount"], marker="o", color="#27ae60")
+    ax.set_title(f"{candidate} - Monthly Total Donations Over Time", fontsize=16)
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Total Contributions ($)")
+    ax.grid(True)
+    fig.tight_layout()
+    fig.savefig(path)
+
+
+def render_candidate_charts(candidate, bundle_path, folder=None):
+    # Runs inside worker processes: reads the bundle itself and returns only
+    # picklable results, (candidate, {chart: path}, seconds)
+    start = time.perf_counter()
+    with open(bundle_path, "r", encoding="utf-8") as file:
+        bundle = json.load(file)
+
+    paths = chart_paths(candidate.replace(' ', '_'), folder)
+    plot_type_breakdown_pie(bundle, candidate, paths["pie"])
+    plot_contributions_over_time(bundle, candidate, paths["timeseries"])
+    return candidate, paths, time.perf_counter() - start
+
+
+def render_charts(jobs, folder=None, workers=None):
+    # jobs maps candidate -> bundle path. workers=1 renders in this process;
+    # more (or None for one per CPU) renders each candidate in its own process.
+    # Returns the candidates whose charts were written.
+    os.makedirs(folder or chart_dir, exist_ok=True)
+    rendered = []
+
+    def report(result):
+        candidate, paths, elapsed = result
+        rendered.append(candidate)
+        print(f"🖼️ Rendered charts for {candidate} in {elapsed:.2f}s")
+
+    if workers == 1 or len(jobs) <= 1:
+        for candidate, bundle_path in jobs.items():
+            try:
+                report(render_candidate_charts(candidate, bundle_path, folder))
+            except Exception as e:
+                print(f"❌ Error rendering charts for {candidate}: {e}")
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(render_candidate_charts, candidate, bundle_path, folder): candidate
+                for candidate, bundle_path in jobs.items()
+            }
+            for future in as_completed(futures):
+                try:
+                    report(future.result())
+                except Exception as e:
+                    print(f"❌ Error rendering charts for {futures[future]}: {e}")
+    return rendered
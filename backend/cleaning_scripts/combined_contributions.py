@@ -0,0 +1,145 @@
+import hashlib
+import io
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+try:
+    from .contributor_names import add_contributor_columns
+    from .deduplication import deduplicate_contributions
+    from .entity_resolution import add_entity_ids
+    from .file_io import file_sha256, nulls_to_nan, write_atomically
+except ImportError:
+    from contributor_names import add_contributor_columns
+    from deduplication import deduplicate_contributions
+    from entity_resolution import add_entity_ids
+    from file_io import file_sha256, nulls_to_nan, write_atomically
+
+# Typed loading of output/*_combined_contributions.csv. Shared by the API's
+# contribution store and the pipeline's aggregate step so both see the same
+# dtypes and the same parsed dates.
+#
+# The pipeline also writes the typed frame next to the CSV as
+# *_combined_contributions.parquet, tagged with the SHA-256 of the CSV it was
+# built from. The API loads that instead of parsing the CSV; the CSV stays
+# the public download.
+
+COLUMNAR_VERSION = 2
+
+CSV_DTYPES = {
+    "ContributorGroup": "category",
+    "ContributionAmount": "float64",
+    "First_Name": "object",
+    "Last_Name": "object",
+    "Business_Name": "object",
+    "ContributionDate": "object",
+    "Employer": "category",
+    "Occupation": "category",
+    "Donor_City": "category",
+    "Donor_State": "category",
+    "ContributorName": "object",
+    "ContributorKey": "object",
+    "ContributorID": "object",
+    "EmployerID": "object",
+    "Source": "category",
+    "RowKey": "object",
+}
+
+
+def parse_contribution_dates(dates):
+    # ELEC filings use MM/DD/YYYY but some rows carry two-digit years
+    parsed = pd.to_datetime(dates, format="%m/%d/%Y", errors="coerce")
+    short = parsed.isna() & dates.notna()
+    if short.any():
+        parsed[short] = pd.to_datetime(dates[short], format="%m/%d/%y", errors="coerce")
+    return parsed
+
+
+def read_combined_contributions(raw):
+    df = pd.read_csv(io.BytesIO(raw), dtype=CSV_DTYPES)
+    df["ContributionDate"] = parse_contribution_dates(df["ContributionDate"])
+
+    # Files built before the pipeline emitted contributor identity columns
+    if "ContributorKey" not in df.columns:
+        df = add_contributor_columns(df)
+    # and before it deduplicated them (within the file only: no Source column)
+    if "RowKey" not in df.columns:
+        df = deduplicate_contributions(df, df["ContributionDate"])
+    # and before it resolved entity IDs across candidates. Resolved here they
+    # only span this file, so the API resolves its stacked frame again.
+    if "ContributorID" not in df.columns:
+        df = add_entity_ids(df)
+        df.attrs["entity_ids"] = "file"
+    return df
+
+
+def read_combined_rows(path):
+    # A combined contributions file as written (dates left as text), for
+    # rewriting it; files from before contributor identity columns get them
+    df = pd.read_csv(path, dtype=CSV_DTYPES)
+    if "ContributorKey" not in df.columns:
+        df = add_contributor_columns(df)
+    return df
+
+
+def load_combined_contributions(path):
+    # Returns the typed frame and the SHA-256 of the file it came from,
+    # which identifies the data version for derived artifacts
+    with open(path, "rb") as file:
+        raw = file.read()
+    return read_combined_contributions(raw), hashlib.sha256(raw).hexdigest()
+
+
+def write_csv(df, path):
+    write_atomically(path, lambda tmp_path: df.to_csv(tmp_path, index=False))
+
+
+def columnar_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".parquet"
+
+
+def write_columnar(df, source_sha256, path):
+    # Returns False when pyarrow is not installed and nothing was written
+    if pa is None:
+        return False
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **table.schema.metadata,
+        b"columnar_version": str(COLUMNAR_VERSION).encode("ascii"),
+        b"source_sha256": source_sha256.encode("ascii"),
+    })
+    write_atomically(path, lambda tmp_path: pq.write_table(table, tmp_path, compression="zstd"))
+    return True
+
+
+def load_columnar(path):
+    # (frame, source SHA-256) from a typed table, or None if it is missing,
+    # unreadable or from another format version
+    if pq is None:
+        return None
+    try:
+        table = pq.read_table(path, memory_map=True)
+    except (OSError, pa.ArrowException):
+        return None
+    metadata = table.schema.metadata or {}
+    if metadata.get(b"columnar_version") != str(COLUMNAR_VERSION).encode("ascii"):
+        return None
+
+    return nulls_to_nan(table.to_pandas()), metadata[b"source_sha256"].decode("ascii")
+
+
+def load_contributions(csv_path):
+    # The typed table when it was written from the CSV as it is now, else
+    # the CSV. Either way returns (frame, SHA-256 of the CSV).
+    path = columnar_path(csv_path)
+    if os.path.exists(path):
+        loaded = load_columnar(path)
+        if loaded is not None and loaded[1] == file_sha256(csv_path):
+            return loaded
+    return load_combined_contributions(csv_path)
@@ -0,0 +1,53 @@
+import pandas as pd
+
+# Canonical contributor identity shared by the cleaning pipeline and the API.
+# ContributorName is the display name: "First Last" for people, otherwise the
+# business name, otherwise "Unknown". ContributorKey is the normalized form
+# used for grouping, so case and punctuation differences between ELEC and P2P
+# filings ("Pamela Bowers-Smith" / "PAMELA BOWERS-SMITH") collapse together.
+# Near-duplicate spellings are merged further by entity_resolution.
+
+# Words that mark a name as a business; also stripped when resolving entities
+business_keywords = r"\b(LLC|INC|PC|CORP|CORPORATION|L\.L\.C\.|L\.P\.|LP|CO\.|COMPANY|INDUSTRIES|GROUP|ENTERPRISES|ASSOCIATES|SERVICES|PARTNERS|HOLDINGS)\b"
+
+# Employer values that say nothing about who the donor works for
+employer_placeholders = {
+    "UNKNOWN", "NONE", "N A", "NA", "NOT EMPLOYED", "UNEMPLOYED", "RETIRED",
+    "SELF", "SELF EMPLOYED", "HOMEMAKER", "STUDENT", "INFORMATION REQUESTED",
+}
+
+
+def clean_name_part(values):
+    return (
+        values.fillna("")
+        .astype(str)
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip()
+    )
+
+
+def build_contributor_names(df):
+    person = (clean_name_part(df["First_Name"]) + " " + clean_name_part(df["Last_Name"])).str.strip()
+    business = clean_name_part(df["Business_Name"])
+
+    names = person.where(person != "", business)
+    return names.where(names != "", "Unknown")
+
+
+def build_contributor_keys(names):
+    keys = (
+        names.str.upper()
+        .str.replace(r"[^A-Z0-9]+", " ", regex=True)
+        .str.strip()
+    )
+    return keys.where(keys != "", "UNKNOWN")
+
+
+def normalize_name_query(query):
+    return build_contributor_keys(pd.Series([query], dtype=object)).iloc[0]
+
+
+def add_contributor_columns(df):
+    df["ContributorName"] = build_contributor_names(df)
+    df["ContributorKey"] = build_contributor_keys(df["ContributorName"])
+    return df
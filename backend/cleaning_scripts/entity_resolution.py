@@ -0,0 +1,231 @@
+import hashlib
+import re
+from collections import Counter, defaultdict
+
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz, process
+
+try:
+    from .contributor_names import business_keywords, employer_placeholders
+except ImportError:
+    from contributor_names import business_keywords, employer_placeholders
+
+# Entity resolution for contributor and employer names. ContributorKey only
+# folds case and punctuation, so "ACME LLC", "Acme, L.L.C." and "Acme Corp"
+# or a misspelt surname are still different donors. Here names are normalized
+# further (business suffixes from business_keywords dropped) and near
+# duplicates are clustered with rapidfuzz, comparing only names that share a
+# blocking key so the work grows with the size of the blocks, not n^2.
+#
+# A close score alone does not merge two names:
+# - a word shorter than MIN_TYPO_LENGTH that differs between the spellings
+#   may only be cut short (LOCA / LOCAL, NEW YO / NEW YORK: ELEC truncates
+#   long names), not misspelt (ARO / ARCO, AID / AJD are other names), and
+#   names shorter than SHORT_NAME_LENGTH need SHORT_NAME_SCORE_CUTOFF
+# - two people (individual donors) also need a second field to agree, a city
+#   or an employer, since MOHAMMAD KHAN and MUHAMMAD KHAN are often two donors
+# Spellings that differ only by spaces (JP MORGAN / JPMORGAN) or by a middle
+# initial (JOHN A SMITH / JOHN SMITH) always merge.
+#
+# Each cluster gets an ID derived from its canonical (smallest) normalized
+# name: "C" + hash for contributors in ContributorID, "E" + hash for
+# employers in EmployerID. A cluster, and so its ID, depends on every name
+# resolved with it: the pipeline resolves all candidates at once
+# (add_entity_ids_across) and stores the IDs in the combined files, so a
+# donor has the same ID in every candidate's file and in the overlap.
+
+RESOLUTION_SCORE_CUTOFF = 92
+SHORT_NAME_LENGTH = 12
+SHORT_NAME_SCORE_CUTOFF = 96
+MIN_TYPO_LENGTH = 5
+# Rows of a block scored against the whole block at a time, bounding memory
+CDIST_CHUNK_SIZE = 1000
+
+ENTITY_ID_COLUMNS = ["ContributorID", "EmployerID"]
+
+# business_keywords matched after periods are dropped ("L.L.C." -> "LLC")
+business_suffixes = re.compile(business_keywords.replace(r"\.", ""))
+
+
+def entity_keys(names):
+    # Upper-cased, without periods or business suffixes, punctuation folded to
+    # spaces; names that are nothing but a suffix keep it
+    upper = names.astype(object).fillna("").astype(str).str.upper().str.replace(".", "", regex=False)
+    upper = upper.str.replace("&", " AND ", regex=False)
+    folded = upper.str.replace(r"[^A-Z0-9]+", " ", regex=True).str.strip()
+    stripped = (
+        upper.str.replace(business_suffixes, " ", regex=True)
+        .str.replace(r"[^A-Z0-9]+", " ", regex=True)
+        .str.strip()
+    )
+    return stripped.where(stripped != "", folded)
+
+
+def blocking_keys(key):
+    # A name is compared with names sharing its first token and the initial
+    # of its last, or its last token and the initial of its first, so a typo
+    # in either half still meets the other spelling
+    tokens = key.split()
+    first, last = tokens[0], tokens[-1]
+    return (("F", first, last[0]), ("L", last, first[0]))
+
+
+class DisjointSet:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, item):
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[max(a, b)] = min(a, b)
+
+
+def differing_words(a, b):
+    # Words of a that b does not have, and words of b that a does not have
+    words_a, words_b = Counter(a.split()), Counter(b.split())
+    return list((words_a - words_b).elements()), list((words_b - words_a).elements())
+
+
+def cut_short(word, others):
+    return any(other.startswith(word) or word.startswith(other) for other in others)
+
+
+def split_middle_initials(key):
+    # ("JOHN SMITH", {"A"}) for "JOHN A SMITH"
+    tokens = key.split()
+    middle = set(range(1, len(tokens) - 1))
+    initials = {token for position, token in enumerate(tokens) if position in middle and len(token) == 1}
+    rest = [token for position, token in enumerate(tokens) if position not in middle or len(token) > 1]
+    return " ".join(rest), initials
+
+
+def close_enough(a, b, score, score_cutoff):
+    if a.replace(" ", "") == b.replace(" ", ""):
+        return True
+    if min(len(a), len(b)) < SHORT_NAME_LENGTH and score < max(score_cutoff, SHORT_NAME_SCORE_CUTOFF):
+        return False
+    only_a, only_b = differing_words(a, b)
+    return all(len(word) >= MIN_TYPO_LENGTH or cut_short(word, only_b) for word in only_a) and all(
+        len(word) >= MIN_TYPO_LENGTH or cut_short(word, only_a) for word in only_b
+    )
+
+
+def resolve_entities(keys, contexts=None, score_cutoff=RESOLUTION_SCORE_CUTOFF):
+    # Maps every unique normalized name to the canonical name of its cluster.
+    # contexts maps the names of people to the set of (field, value) they were
+    # seen with (see person_contexts); names missing from it are organizations.
+    contexts = contexts or {}
+    keys = sorted(set(keys) - {""})
+    blocks = defaultdict(list)
+    for key_id, key in enumerate(keys):
+        for block in blocking_keys(key):
+            blocks[block].append(key_id)
+
+    clusters = DisjointSet(len(keys))
+    for key_ids in blocks.values():
+        if len(key_ids) < 2:
+            continue
+        names = [keys[key_id] for key_id in key_ids]
+        for start in range(0, len(names), CDIST_CHUNK_SIZE):
+            scores = process.cdist(
+                names[start:start + CDIST_CHUNK_SIZE],
+                names,
+                scorer=fuzz.token_sort_ratio,
+                score_cutoff=score_cutoff,
+                dtype=np.uint8,
+            )
+            for row, column in zip(*np.nonzero(scores)):
+                a, b = names[start + row], names[column]
+                if start + row >= column or not close_enough(a, b, scores[row, column], score_cutoff):
+                    continue
+                if (a in contexts or b in contexts) and not (contexts.get(a, set()) & contexts.get(b, set())):
+                    continue  # Two people with nothing else in common
+                clusters.union(key_ids[start + row], key_ids[column])
+
+    # Names that differ only by middle initials, when the initials agree
+    # (JOHN A SMITH and JOHN B SMITH stay apart, and both apart from JOHN SMITH)
+    variants = defaultdict(list)
+    for key_id, key in enumerate(keys):
+        name, initials = split_middle_initials(key)
+        variants[name].append((len(initials), initials, key_id))
+    for spellings in variants.values():
+        spellings.sort(key=lambda spelling: spelling[0])
+        if all(a[1] <= b[1] for a, b in zip(spellings, spellings[1:])):
+            for _, _, key_id in spellings[1:]:
+                clusters.union(spellings[0][2], key_id)
+
+    # Keys are sorted, so each cluster's root is its smallest key
+    return {key: keys[clusters.find(key_id)] for key_id, key in enumerate(keys)}
+
+
+def text_column(df, column):
+    if column not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    return df[column].astype(object).fillna("").astype(str).str.strip()
+
+
+def person_contexts(df, keys):
+    # {name: {(field, value)}} for people, named from First_Name/Last_Name or
+    # in an Individual group (P2P donors): the cities and employers each
+    # spelling was seen with, which two spellings must share to be merged
+    named = (text_column(df, "First_Name") + text_column(df, "Last_Name")) != ""
+    person = (named | text_column(df, "ContributorGroup").str.startswith("Individual")).to_numpy()
+
+    cities = entity_keys(text_column(df, "Donor_City"))
+    employers = entity_keys(df["Employer"])
+    contexts = defaultdict(set)
+    for key, city, employer in zip(keys[person].tolist(), cities[person].tolist(), employers[person].tolist()):
+        entry = contexts[key]
+        if city:
+            entry.add(("city", city))
+        # P2P rows spell a missing employer "Nan"
+        if employer not in ("", "NAN") and employer not in employer_placeholders:
+            entry.add(("employer", employer))
+    return contexts
+
+
+def cluster_ids(names, prefix, contexts=None):
+    # Cluster ID per name; missing or blank names get NaN
+    keys = entity_keys(names)
+    canonical = resolve_entities(keys.unique(), contexts)
+    ids = {
+        key: prefix + hashlib.sha1(root.encode("utf-8")).hexdigest()[:12]
+        for key, root in canonical.items()
+    }
+    return keys.map(ids).where(names.notna(), np.nan)
+
+
+def add_entity_ids(df):
+    # Needs ContributorName (see contributor_names.add_contributor_columns)
+    contexts = person_contexts(df, entity_keys(df["ContributorName"]))
+    df["ContributorID"] = cluster_ids(df["ContributorName"], "C", contexts)
+    df["EmployerID"] = cluster_ids(df["Employer"], "E")
+    return df
+
+
+def add_entity_ids_across(frames):
+    # {name: frame} -> new frames with IDs resolved over all of them at once,
+    # so the same donor or employer gets one ID in every frame
+    columns = ["ContributorName", "Employer", "First_Name", "Last_Name", "Donor_City", "ContributorGroup"]
+    stacked = pd.concat(
+        [df[[column for column in columns if column in df.columns]].astype(object) for df in frames.values()],
+        ignore_index=True,
+    )
+    ids = add_entity_ids(stacked)[ENTITY_ID_COLUMNS]
+
+    resolved = {}
+    start = 0
+    for name, df in frames.items():
+        part = ids.iloc[start:start + len(df)]
+        resolved[name] = df.assign(**{column: part[column].to_numpy() for column in ENTITY_ID_COLUMNS})
+        start += len(df)
+    return resolved
@@ -0,0 +1,42 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# File helpers shared by the pipeline's writers and the typed-table readers.
+# Every output is written beside its final path and renamed over it, so the
+# API (its refresh, downloads) and the next pipeline run read either the
+# previous file or the new one, never a partial one.
+
+
+def write_atomically(path, write):
+    # write(tmp_path) writes the new contents; they then replace path in one step
+    tmp_path = path + ".tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def write_json(value, path, **options):
+    def write(tmp_path):
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(value, file, **options)
+
+    write_atomically(path, write)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def nulls_to_nan(df):
+    # Parquet hands back nulls in text columns as None; the CSV reader and
+    # the cleaning code expect NaN
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].where(df[col].notna(), np.nan)
+    return df
@@ -0,0 +1,99 @@
+import json
+import os
+from itertools import combinations
+
+try:
+    from .contributor_names import build_contributor_keys, employer_placeholders
+    from .file_io import write_json
+except ImportError:
+    from contributor_names import build_contributor_keys, employer_placeholders
+    from file_io import write_json
+
+# Donors and employers shared between campaigns. Built once from all
+# combined contributions (stacked, with a Candidate column) and written to
+# output/donor_overlap.json: for donors and for employers, a candidate x
+# candidate matrix of shared-key counts plus, for every pair, the shared keys
+# with what each side received. Keys are the resolved ContributorID and
+# EmployerID, which the pipeline resolves across all candidates at once.
+
+OVERLAP_VERSION = 3
+OVERLAP_KINDS = ("donors", "employers")
+
+
+def overlap_path(folder):
+    return os.path.join(folder, "donor_overlap.json")
+
+
+def key_totals(df, key_column, name_column):
+    # One row per (candidate, key): first spelling seen and amount received
+    return (
+        df.groupby(["Candidate", key_column], observed=True)
+        .agg(Name=(name_column, "first"), Amount=("ContributionAmount", "sum"))
+        .reset_index()
+    )
+
+
+def overlap_tables(totals, key_column):
+    # Shared keys between every pair of candidates, found with hash joins on
+    # the per-candidate key tables; diagonal entries are each candidate's own count
+    per_candidate = {
+        str(candidate): group.set_index(key_column)[["Name", "Amount"]]
+        for candidate, group in totals.groupby("Candidate", observed=True)
+    }
+    candidates = sorted(per_candidate)
+    matrix = {a: {a: len(per_candidate[a])} for a in candidates}
+    pairs = {a: {} for a in candidates}
+
+    for a, b in combinations(candidates, 2):
+        shared = per_candidate[a].join(per_candidate[b], how="inner", lsuffix="_a", rsuffix="_b")
+        shared["Total"] = shared["Amount_a"] + shared["Amount_b"]
+        shared = shared.sort_values("Total", ascending=False)
+
+        matrix[a][b] = matrix[b][a] = len(shared)
+        pairs[a][b] = [
+            {"key": key, "name": name, "amounts": {a: round(amount_a, 2), b: round(amount_b, 2)}, "total": round(total, 2)}
+            for key, name, amount_a, amount_b, total in zip(
+                shared.index, shared["Name_a"], shared["Amount_a"], shared["Amount_b"], shared["Total"]
+            )
+        ]
+    return {"matrix": matrix, "pairs": pairs}
+
+
+def build_overlap(df):
+    donors = df[df["ContributorKey"] != "UNKNOWN"]
+
+    employers = df[df["Employer"].notna()].copy()
+    employers["EmployerKey"] = build_contributor_keys(employers["Employer"].astype(str))
+    employers = employers[~employers["EmployerKey"].isin(employer_placeholders)]
+
+    return {
+        "version": OVERLAP_VERSION,
+        "candidates": sorted(str(candidate) for candidate in df["Candidate"].unique()),
+        "donors": overlap_tables(key_totals(donors, "ContributorID", "ContributorName"), "ContributorID"),
+        "employers": overlap_tables(key_totals(employers, "EmployerID", "Employer"), "EmployerID"),
+    }
+
+
+def shared_between(overlap, kind, a, b):
+    # Shared entries for a candidate pair in either order, or None if unknown
+    if a == b or a not in overlap["candidates"] or b not in overlap["candidates"]:
+        return None
+    first, second = sorted((a, b))
+    return overlap[kind]["pairs"][first][second]
+
+
+def write_overlap(overlap, sources, path):
+    # sources maps candidate -> SHA-256 of the combined CSV it was built from
+    write_json({**overlap, "sources": sources}, path)
+
+
+def load_overlap(path, sources):
+    # Returns the overlap only if it was built from exactly these data versions
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            overlap = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if overlap.get("version") != OVERLAP_VERSION or overlap.get("sources") != sources:
+        return None
+    return overlap
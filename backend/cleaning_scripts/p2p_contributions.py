@@ -1,57 +1,328 @@
 from bs4 import BeautifulSoup
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from html.parser import HTMLParser
 import pandas as pd
 import os
 import re
+import time
 
-def combine_html_p2p_data(folder):
-    html_pattern = re.compile(r"P2P_(\d{4})_Contributions\.html$")
-    all_data = []
-    final_headers = []
+try:
+    from .file_io import file_sha256, nulls_to_nan, write_atomically
+    from .stage_timings import report_timings, timed_stage
+except ImportError:
+    from file_io import file_sha256, nulls_to_nan, write_atomically
+    from stage_timings import report_timings, timed_stage
 
+html_pattern = re.compile(r"P2P_(\d{4})_Contributions\.html$")
+
+# The committed workbook is the source of the P2P data. The pipeline reads a
+# typed Parquet copy of it, tagged with the workbook's SHA-256: the copy is
+# used only while it matches the workbook, and is rebuilt when the workbook
+# changes.
+#
+# Parsing the HTML exports in raw/ writes its own table (in the working
+# directory, like the original Excel export), never the pipeline's input:
+# raw/ only has some years. merge=True replaces just the parsed years in the
+# pipeline's table and keeps every other year.
+data_dir = os.path.join(os.path.dirname(__file__), "candidate_contributions")
+p2p_table_file = os.path.join(data_dir, "Combined_P2P_Contributions.parquet")
+p2p_excel_file = os.path.join(data_dir, "Combined_P2P_Contributions.xlsx")
+parsed_p2p_file = "Combined_P2P_Contributions.parquet"
+
+p2p_numeric_columns = ["Vendor_ID", "Filing_Year", "Aggregate_Contribution_Amount", "Contribution_Amount", "Year"]
+p2p_date_columns = ["Filing_Date", "Contribution_Date"]
+p2p_category_columns = ["Business_Name", "Business_City", "Business_State", "Amendment", "Recipient_Name"]
+
+
+class TableRowParser(HTMLParser):
+    # Event-driven <tr>/<td> collector. Finished rows pile up in self.rows
+    # until the caller drains them, so memory stays bounded by one chunk.
+    # Cell text matches BeautifulSoup's get_text(strip=True): every text
+    # node is stripped on its own and the pieces are joined with "".
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows = []
+        self._row = None
+        self._cell = None
+        self._text = []
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text()
+        if tag == "tr":
+            self._row = []
+        elif tag == "td" and self._row is not None:
+            self._cell = []
+
+    def handle_endtag(self, tag):
+        self._flush_text()
+        if tag == "td" and self._cell is not None:
+            self._row.append("".join(self._cell))
+            self._cell = None
+        elif tag == "tr" and self._row is not None:
+            self.rows.append(self._row)
+            self._row = None
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._text.append(data)
+
+    def _flush_text(self):
+        if self._text:
+            text = "".join(self._text).strip()
+            if text:
+                self._cell.append(text)
+            self._text = []
+
+
+def iter_stream_rows(filepath, chunk_size=64 * 1024):
+    parser = TableRowParser()
+    with open(filepath, "r", encoding="utf-8") as file:
+        for chunk in iter(lambda: file.read(chunk_size), ""):
+            parser.feed(chunk)
+            yield from parser.rows
+            parser.rows.clear()
+    parser.close()
+    yield from parser.rows
+
+
+def iter_soup_rows(filepath):
+    with open(filepath, "r", encoding="utf-8") as file:
+        soup = BeautifulSoup(file, "html.parser")
+
+    for row in soup.find_all("tr"):
+        yield [cell.get_text(strip=True) for cell in row.find_all("td")]
+
+
+row_parsers = {
+    "stream": iter_stream_rows,
+    "soup": iter_soup_rows,
+}
+
+
+@timed_stage
+def parse_p2p_file(filepath, year, parser="stream"):
+    # Parses one year's HTML export into a DataFrame. Runs inside worker
+    # processes, so it only returns picklable results: (frame, row count, seconds).
+    start = time.perf_counter()
+    rows = row_parsers[parser](filepath)
+
+    header_cells = next(rows, None)
+    if header_cells is None:
+        return None, 0, time.perf_counter() - start
+
+    data = [cells for cells in rows if len(cells) == len(header_cells)]
+    if not data:
+        return None, 0, time.perf_counter() - start
+
+    df = pd.DataFrame(data, columns=header_cells)
+    df["Year"] = year
+    return df, len(df), time.perf_counter() - start
+
+
+def find_p2p_files(folder, years=(2020, 2024)):
+    # years is an inclusive (first, last) range; None selects every file
+    found = []
     for filename in os.listdir(folder):
         match = html_pattern.match(filename)
         if match:
             year = int(match.group(1))
-            if not (2020 <= year <= 2024):
-                continue  # Skip years outside 2020–2024
+            if years is not None and not (years[0] <= year <= years[1]):
+                continue  # Skip years outside the requested range
+            found.append((year, filename))
+    return sorted(found)
 
-            filepath = os.path.join(folder, filename)
 
-            try:
-                with open(filepath, "r", encoding="utf-8") as file:
-                    soup = BeautifulSoup(file, "html.parser")
+@timed_stage
+def type_p2p_columns(df):
+    for col in p2p_numeric_columns:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    for col in p2p_date_columns:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], format="%m/%d/%Y", errors="coerce")
+
+    # Remaining text columns hold str or NaN only, so they serialize cleanly
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    for col in p2p_category_columns:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    return df
+
 
-                rows = soup.find_all("tr")
-                if len(rows) < 2:
-                    print(f"⚠️ Not enough rows in {filename}, skipping.")
-                    continue
+def pickle_fallback_path(path):
+    return os.path.splitext(path)[0] + ".pkl"
 
-                # Header row
-                header_cells = [cell.get_text(strip=True) for cell in rows[0].find_all("td")]
-                if not final_headers:
-                    final_headers = header_cells + ["Year"]  # Save only once
 
-                # Data rows
-                for row in rows[1:]:
-                    cells = [cell.get_text(strip=True) for cell in row.find_all("td")]
-                    if len(cells) == len(header_cells):
-                        cells.append(year)
-                        all_data.append(cells)
+@timed_stage
+def save_p2p_contributions(df, path=None):
+    # Parquet needs pyarrow; without it fall back to a typed pickle
+    path = path or p2p_table_file
+    try:
+        write_atomically(path, lambda tmp_path: df.to_parquet(tmp_path, index=False))
+    except ImportError:
+        path = pickle_fallback_path(path)
+        write_atomically(path, df.to_pickle)
+    return path
 
-                print(f"✅ Processed {filename}")
 
+def write_excel(df, path):
+    # Through a handle: the engine checks the extension, and path may be a .tmp file
+    with open(path, "wb") as file:
+        df.to_excel(file, index=False, engine="openpyxl")
+
+
+@timed_stage
+def read_p2p_table(path):
+    return nulls_to_nan(pd.read_parquet(path))
+
+
+def table_workbook_sha256(path):
+    # The workbook hash a typed table was built from, None if unreadable
+    try:
+        if path.endswith(".pkl"):
+            return pd.read_pickle(path).attrs.get("workbook_sha256")
+        return pd.read_parquet(path, columns=[]).attrs.get("workbook_sha256")
+    except (ImportError, OSError, ValueError):
+        return None
+
+
+def resolve_p2p_source(path=None, excel_path=None):
+    # The file load_p2p_contributions reads: the typed table (or its pickle
+    # fallback) when it was built from the current workbook, else the workbook
+    path = path or p2p_table_file
+    excel_path = excel_path or p2p_excel_file
+    excel_sha256 = file_sha256(excel_path) if os.path.exists(excel_path) else None
+
+    for table_path in (path, pickle_fallback_path(path)):
+        if os.path.exists(table_path) and (excel_sha256 is None or table_workbook_sha256(table_path) == excel_sha256):
+            return table_path
+    return excel_path if excel_sha256 is not None else None
+
+
+@timed_stage
+def load_p2p_contributions(path=None, excel_path=None):
+    path = path or p2p_table_file
+    source = resolve_p2p_source(path, excel_path)
+    if source is None:
+        raise FileNotFoundError(f"No combined P2P data found at {path} or {excel_path or p2p_excel_file}")
+
+    if source.endswith(".parquet"):
+        try:
+            return read_p2p_table(source)
+        except ImportError:
+            source = pickle_fallback_path(path)
+            if not os.path.exists(source):
+                source = excel_path or p2p_excel_file
+    if source.endswith(".pkl"):
+        return pd.read_pickle(source)
+
+    # No table built from this workbook yet: convert it once
+    df = type_p2p_columns(pd.read_excel(source))
+    df.attrs["workbook_sha256"] = file_sha256(source)
+    saved_path = save_p2p_contributions(df, path)
+    print(f"🎯 Converted {source} to {saved_path}")
+    return df
+
+
+def p2p_years(df):
+    return set(df["Year"].dropna().astype(int))
+
+
+def merge_p2p_years(parsed_df, path=None, excel_path=None):
+    # The pipeline's P2P data with the years in parsed_df replaced by them and
+    # every other year kept; tagged with the same workbook, so it stays in use
+    # until the workbook itself changes
+    existing = load_p2p_contributions(path, excel_path)
+    kept = existing[~existing["Year"].isin(p2p_years(parsed_df))]
+    merged = type_p2p_columns(pd.concat([kept, parsed_df], ignore_index=True).sort_values("Year", kind="stable"))
+    merged = merged.reset_index(drop=True)
+    merged.attrs["workbook_sha256"] = existing.attrs.get("workbook_sha256")
+    return merged
+
+
+def missing_p2p_years(df, path):
+    # Years the P2P data at path has that df does not
+    try:
+        return sorted(p2p_years(load_p2p_contributions(path)) - p2p_years(df))
+    except FileNotFoundError:
+        return []
+
+
+@timed_stage
+def combine_html_p2p_data(folder, parser="stream", years=(2020, 2024), workers=1, output_path=None, excel=False, merge=False):
+    # workers=1 parses in this process; more (or None for one per CPU)
+    # parses each year's file in its own worker process. Writes output_path
+    # (default parsed_p2p_file), or with merge=True the parsed years into
+    # the pipeline's table. excel=True also exports the result to
+    # Combined_P2P_Contributions.xlsx in the working directory.
+    files = find_p2p_files(folder, years)
+    started = time.perf_counter()
+    frames = {}
+
+    def report(filename, result):
+        df, row_count, elapsed = result
+        if df is None:
+            print(f"⚠️ Not enough rows in {filename}, skipping.")
+            return
+        frames[filename] = df
+        print(f"✅ Processed {filename}: {row_count} rows in {elapsed:.2f}s")
+
+    if workers == 1:
+        for year, filename in files:
+            try:
+                report(filename, parse_p2p_file(os.path.join(folder, filename), year, parser))
             except Exception as e:
                 print(f"❌ Error in {filename}: {e}")
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(parse_p2p_file, os.path.join(folder, filename), year, parser): filename
+                for year, filename in files
+            }
+            for future in as_completed(futures):
+                filename = futures[future]
+                try:
+                    report(filename, future.result())
+                except Exception as e:
+                    print(f"❌ Error in {filename}: {e}")
+
+    # Create DataFrame, keeping files in year order
+    if frames:
+        df = pd.concat([frames[filename] for _, filename in files if filename in frames], ignore_index=True)
+        print(f"⏱️ Parsed {len(frames)} files ({len(df)} rows) in {time.perf_counter() - started:.2f}s")
+        df = type_p2p_columns(df)
+
+        if merge:
+            df = merge_p2p_years(df)
+            output_path = p2p_table_file
+        else:
+            output_path = output_path or parsed_p2p_file
+            if os.path.abspath(output_path) == os.path.abspath(p2p_table_file):
+                # Replacing the pipeline's table must not lose years it has
+                missing = missing_p2p_years(df, output_path)
+                if missing:
+                    print(f"❌ Not replacing {output_path}: it has {missing} and the parsed files do not; use merge=True")
+                    return
+                if os.path.exists(p2p_excel_file):
+                    df.attrs["workbook_sha256"] = file_sha256(p2p_excel_file)
+        saved_path = save_p2p_contributions(df, output_path)
+        print(f"🎯 Saved combined data to {saved_path}")
 
-    # Create DataFrame
-    if all_data:
-        df = pd.DataFrame(all_data, columns=final_headers)
-        output_path = "Combined_P2P_Contributions.xlsx"
-        df.to_excel(output_path, index=False)
-        print(f"🎯 Saved combined data to {output_path}")
+        if excel:
+            # Always beside parsed_p2p_file: the workbook in candidate_contributions
+            # is the source of the pipeline's table and is never rewritten here
+            excel_path = os.path.splitext(parsed_p2p_file)[0] + ".xlsx"
+            if os.path.abspath(excel_path) == os.path.abspath(p2p_excel_file):
+                print(f"❌ Not exporting Excel over the source workbook {p2p_excel_file}")
+                return
+            write_atomically(excel_path, lambda tmp_path: write_excel(df, tmp_path))
+            print(f"🎯 Exported Excel copy to {excel_path}")
     else:
         print("⚠️ No valid data found in HTML files.")
 
 
 if __name__ == "__main__":
-    combine_html_p2p_data("raw")  # Change to your folder name if needed
\ No newline at end of file
+    combine_html_p2p_data("raw", workers=None)  # Change to your folder name if needed
+    report_timings()
@@ -0,0 +1,63 @@
+import functools
+import json
+import os
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Opt-in stage timings for the cleaning scripts, enabled with
+# PIPELINE_TIMINGS=1 before they are imported. Functions wrapped with
+# @timed_stage and blocks inside `with stage(name):` add their wall time (and
+# the rows of any DataFrame a function returns) to a per-process table that
+# update_all_donations prints and writes to output/stage_timings.json.
+# Times are inclusive: a stage that calls another stage counts its time too.
+# Disabled, @timed_stage returns the function unchanged.
+
+ENABLED = os.environ.get("PIPELINE_TIMINGS", "") in ("1", "true", "yes")
+
+timings = {}  # stage -> {"calls", "seconds", "rows"}
+
+
+def record(name, seconds, rows=0):
+    entry = timings.setdefault(name, {"calls": 0, "seconds": 0.0, "rows": 0})
+    entry["calls"] += 1
+    entry["seconds"] += seconds
+    entry["rows"] += rows
+
+
+@contextmanager
+def stage(name):
+    if not ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def timed_stage(function):
+    if not ENABLED:
+        return function
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        rows = len(result) if isinstance(result, pd.DataFrame) else 0
+        record(function.__name__, time.perf_counter() - start, rows)
+        return result
+    return wrapper
+
+
+def report_timings(path=None):
+    if not ENABLED or not timings:
+        return
+    print(f"\n⏱️ {'stage':<32} {'calls':>6} {'seconds':>9} {'rows':>9}")
+    for name, entry in sorted(timings.items(), key=lambda item: item[1]["seconds"], reverse=True):
+        print(f"   {name:<32} {entry['calls']:>6} {entry['seconds']:>9.3f} {entry['rows']:>9}")
+    if path:
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(timings, file, indent=2, sort_keys=True)
@@ -0,0 +1,444 @@
+import hashlib
+import os
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from cleaning_scripts.aggregates import aggregates_path, build_aggregates, build_comparison, load_aggregates
+from cleaning_scripts.combined_contributions import columnar_path, load_contributions
+from cleaning_scripts.entity_resolution import add_entity_ids
+from cleaning_scripts.overlap import build_overlap, load_overlap, overlap_path
+from donor_index import DonorIndex, GlobalDonorIndex
+from instrumentation import phase
+from query import QueryEngine
+
+# Process-wide cache of each candidate's combined contributions frame.
+# Routes used to pd.read_csv the same file on every hit; now a candidate is
+# loaded once (from the typed Parquet table when the pipeline wrote one), kept
+# with typed columns and only reloaded when its files change. While the
+# background refresh runs (refresher.py) that reload happens off the request
+# path and the new data is swapped in whole.
+
+BASE_DIR = os.path.dirname(__file__)
+OUTPUT_FOLDER = os.environ.get("CONTRIBUTION_STORE_FOLDER", os.path.join(BASE_DIR, "cleaning_scripts", "output"))
+
+# Upper bounds for the cache, overridable from the environment. MAX_BYTES
+# covers the loaded candidate frames and the stacked frame of the candidate
+# set; indexes and summaries derived from them are not counted.
+MAX_CANDIDATES = int(os.environ.get("CONTRIBUTION_STORE_MAX_CANDIDATES", "16"))
+MAX_BYTES = int(os.environ.get("CONTRIBUTION_STORE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Columns the candidate set keeps: what search, comparison and overlap read.
+# The name parts are only kept while names are resolved again.
+SET_COLUMNS = [
+    "ContributionAmount", "ContributionDate", "ContributorGroup", "ContributorName",
+    "ContributorKey", "ContributorID", "Employer", "EmployerID", "Donor_City",
+]
+SET_NAME_COLUMNS = ["First_Name", "Last_Name"]
+
+
+COMBINED_SUFFIX = "_combined_contributions.csv"
+
+
+def combined_csv_path(candidate, folder=OUTPUT_FOLDER):
+    return os.path.join(folder, f"{candidate}{COMBINED_SUFFIX}")
+
+
+def list_candidates(folder=OUTPUT_FOLDER):
+    # Every candidate with a combined contributions file, in name order
+    try:
+        filenames = os.listdir(folder)
+    except OSError:
+        return []
+    return sorted(name[:-len(COMBINED_SUFFIX)] for name in filenames if name.endswith(COMBINED_SUFFIX))
+
+
+class DerivedData:
+    # Data derived from one loaded version (indexes, summaries) is built once,
+    # on first use, and lives as long as that version stays loaded
+    def __init__(self):
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    def _derive(self, name, build):
+        value = self._derived.get(name)
+        if value is None:
+            with self._lock:
+                value = self._derived.get(name)
+                if value is None:
+                    value = self._derived[name] = build()
+        return value
+
+
+class CandidateData(DerivedData):
+    # One loaded data version of a candidate: the typed frame, the SHA-256 of
+    # the CSV it came from, and lazily the aggregate bundle, donor index and
+    # query engine
+    def __init__(self, candidate, frame, version, folder=OUTPUT_FOLDER, modified=None, load_seconds=None):
+        super().__init__()
+        self.candidate = candidate
+        self.frame = frame
+        self.version = version
+        self.folder = folder
+        self.modified = modified  # mtime of the CSV, in seconds
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+
+    @property
+    def aggregates(self):
+        return self._derive("aggregates", self._load_aggregates)
+
+    @property
+    def donor_index(self):
+        return self._derive("donor_index", self._build_donor_index)
+
+    def _build_donor_index(self):
+        with phase("transform"):
+            return DonorIndex(self.frame)
+
+    @property
+    def query_engine(self):
+        return self._derive("query_engine", self._build_query_engine)
+
+    def _build_query_engine(self):
+        with phase("transform"):
+            return QueryEngine(self.frame)
+
+    def _load_aggregates(self):
+        with phase("load"):
+            bundle = load_aggregates(aggregates_path(self.folder, self.candidate), self.version)
+        if bundle is None:
+            # Missing or built from other data: compute it live for this version
+            logging.info(f"Aggregate bundle for {self.candidate} is stale, computing live")
+            with phase("aggregate"):
+                bundle = build_aggregates(self.frame, self.version)
+        return bundle
+
+
+class CandidateSet(DerivedData):
+    # Every candidate's frame stacked into one, keyed by a Candidate column,
+    # for cross-candidate questions. Its version changes with any candidate's.
+    # It is a copy of SET_COLUMNS only, kept apart from the candidates' own
+    # frames (which the store may evict), and counts toward the store's
+    # MAX_BYTES as nbytes.
+    # The pipeline resolves entity IDs across all candidates and stores them,
+    # so a donor has one ContributorID across campaigns and in the CSVs.
+    # Files from before that only have IDs resolved within themselves; with
+    # any of those, names are resolved again over the stacked frame.
+    def __init__(self, candidate_data, folder=OUTPUT_FOLDER):
+        super().__init__()
+        self.folder = folder
+        self.versions = {data.candidate: data.version for data in candidate_data}
+        self.signatures = {}  # the store's file signatures the set was last checked against
+        self.version = hashlib.sha256(repr(sorted(self.versions.items())).encode("utf-8")).hexdigest()
+        self.modified = max((data.modified or 0 for data in candidate_data), default=None)
+
+        resolve = any(data.frame.attrs.get("entity_ids") == "file" for data in candidate_data)
+        columns = SET_COLUMNS + (SET_NAME_COLUMNS if resolve else [])
+        with phase("transform"):
+            frames = [data.frame[columns].assign(Candidate=data.candidate) for data in candidate_data]
+            self.frame = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["Candidate", *columns])
+            self.frame["Candidate"] = self.frame["Candidate"].astype("category")
+            if resolve:
+                self.frame = add_entity_ids(self.frame).drop(columns=SET_NAME_COLUMNS)
+        self.nbytes = int(self.frame.memory_usage(deep=True).sum())
+
+    @property
+    def donor_index(self):
+        return self._derive("donor_index", self._build_donor_index)
+
+    @property
+    def comparison(self):
+        return self._derive("comparison", self._build_comparison)
+
+    def _build_donor_index(self):
+        with phase("transform"):
+            return GlobalDonorIndex(self.frame)
+
+    def _build_comparison(self):
+        with phase("aggregate"):
+            return build_comparison(self.frame)
+
+    @property
+    def overlap(self):
+        return self._derive("overlap", self._load_overlap)
+
+    def _load_overlap(self):
+        with phase("load"):
+            overlap = load_overlap(overlap_path(self.folder), self.versions)
+        if overlap is None:
+            # Missing or built from other data: compute it live for these versions
+            logging.info("Donor overlap is stale, computing live")
+            with phase("aggregate"):
+                overlap = build_overlap(self.frame)
+        return overlap
+
+
+class ContributionStore:
+    def __init__(self, folder=OUTPUT_FOLDER, max_candidates=MAX_CANDIDATES, max_bytes=MAX_BYTES):
+        self.folder = folder
+        self.max_candidates = max_candidates
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # candidate -> (file signature, nbytes, CandidateData)
+        self._set_bytes = 0  # the current candidate set's nbytes
+        self._lock = threading.Lock()
+        # Set while the background refresh (refresher.py) keeps the store
+        # current: requests then use what is loaded without checking the files
+        self.watched = False
+
+    def signature(self, candidate):
+        # Identifies the files a candidate is loaded from, None without a CSV
+        path = combined_csv_path(candidate, self.folder)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        try:
+            table_stat = os.stat(columnar_path(path))
+            table_signature = (table_stat.st_mtime_ns, table_stat.st_size)
+        except OSError:
+            table_signature = None
+        return (stat.st_mtime_ns, stat.st_size, table_signature)
+
+    def get(self, candidate):
+        # Returns the cached CandidateData, or None when the candidate has no
+        # data. Its frame is shared between requests and must not be modified.
+        if self.watched:
+            with self._lock:
+                entry = self._entries.get(candidate)
+                if entry is not None:
+                    self._entries.move_to_end(candidate)
+                    return entry[2]
+
+        signature = self.signature(candidate)
+        if signature is None:
+            self.evict(candidate)
+            return None
+
+        with self._lock:
+            entry = self._entries.get(candidate)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(candidate)
+                return entry[2]
+
+        return self.put(candidate, signature, self.load(candidate))
+
+    def load(self, candidate):
+        # Reads a candidate's files into a new CandidateData, leaving the cache as it is
+        path = combined_csv_path(candidate, self.folder)
+        start = time.perf_counter()
+        with phase("load"):
+            df, version = load_contributions(path)
+        return CandidateData(candidate, df, version, self.folder, os.path.getmtime(path), time.perf_counter() - start)
+
+    def put(self, candidate, signature, data):
+        # Replaces the candidate's entry in one step
+        nbytes = int(data.frame.memory_usage(deep=True).sum())
+        logging.info(f"Loaded {len(data.frame)} contributions for {candidate} ({nbytes / 1024:.0f} KiB)")
+
+        with self._lock:
+            self._entries[candidate] = (signature, nbytes, data)
+            self._entries.move_to_end(candidate)
+            self._shrink()
+        return data
+
+    def changed(self):
+        # {candidate: signature} for every candidate whose files differ from
+        # what is loaded or who is not loaded, None for those whose file is gone
+        signatures = {candidate: self.signature(candidate) for candidate in list_candidates(self.folder)}
+        with self._lock:
+            loaded = {candidate: entry[0] for candidate, entry in self._entries.items()}
+        changed = {
+            candidate: signature
+            for candidate, signature in signatures.items()
+            if signature is not None and loaded.get(candidate) != signature
+        }
+        changed.update({candidate: None for candidate in loaded if signatures.get(candidate) is None})
+        return changed
+
+    def entries(self):
+        # The loaded CandidateData, least recently used first
+        with self._lock:
+            return [entry[2] for entry in self._entries.values()]
+
+    def evict(self, candidate):
+        with self._lock:
+            self._entries.pop(candidate, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def set_candidate_set_bytes(self, nbytes):
+        # The stacked candidate set shares the byte bound with the candidates
+        with self._lock:
+            self._set_bytes = nbytes
+            self._shrink()
+
+    def total_bytes(self):
+        with self._lock:
+            return sum(entry[1] for entry in self._entries.values()) + self._set_bytes
+
+    def _shrink(self):
+        # Drop least recently used candidates, always keeping the newest one
+        total = sum(entry[1] for entry in self._entries.values()) + self._set_bytes
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_candidates or total > self.max_bytes
+        ):
+            candidate, (_, nbytes, _) = self._entries.popitem(last=False)
+            total -= nbytes
+            logging.info(f"Evicted {candidate} from contribution store")
+
+
+store = ContributionStore()
+
+# All candidates stacked together, rebuilt when any candidate's data changes
+_candidate_set = None
+_candidate_set_lock = threading.Lock()
+
+
+def get_candidate_data(candidate):
+    return store.get(candidate)
+
+
+def get_candidate_set():
+    # While the store is watched the refresh swaps in a new set when the data
+    # changes, so requests take the current one as it is
+    if store.watched:
+        candidate_set = _candidate_set
+        if candidate_set is not None:
+            return candidate_set
+    return update_candidate_set()
+
+
+def update_candidate_set(warm=False):
+    # Rebuilds the set when any candidate's version changed. The files are
+    # compared by signature first, so an unchanged set never reloads the
+    # candidates the store evicted to make room for it. With warm, its
+    # derived data is built before it replaces the previous set.
+    global _candidate_set
+    signatures = {candidate: store.signature(candidate) for candidate in list_candidates(store.folder)}
+    signatures = {candidate: signature for candidate, signature in signatures.items() if signature is not None}
+    candidate_set = _candidate_set
+    if candidate_set is not None and candidate_set.signatures == signatures:
+        return candidate_set
+
+    candidate_data = [store.get(candidate) for candidate in signatures]
+    candidate_data = [data for data in candidate_data if data is not None]
+    versions = {data.candidate: data.version for data in candidate_data}
+
+    with _candidate_set_lock:
+        if _candidate_set is None or _candidate_set.versions != versions:
+            candidate_set = CandidateSet(candidate_data, store.folder)
+            if warm:
+                warm_candidate_set(candidate_set)
+            _candidate_set = candidate_set
+            store.set_candidate_set_bytes(candidate_set.nbytes)
+            logging.info(
+                f"Stacked {len(_candidate_set.frame)} contributions from {len(versions)} candidates "
+                f"({candidate_set.nbytes / 1024:.0f} KiB)"
+            )
+        _candidate_set.signatures = signatures
+        return _candidate_set
+
+
+def get_global_donor_index():
+    return get_candidate_set().donor_index
+
+
+def warm_candidate_data(data):
+    # Builds everything requests derive from one candidate's data
+    data.aggregates
+    data.donor_index
+    data.query_engine
+
+
+def warm_candidate_set(candidate_set):
+    candidate_set.donor_index
+    candidate_set.comparison
+    candidate_set.overlap
+
+
+# Set by preload(): when it last ran and how long it took, in seconds
+preload_stats = {"finished_at": None, "seconds": None}
+
+
+def preload():
+    # Loads every candidate and builds everything derived from the data up
+    # front. Under gunicorn this runs in the master before workers fork
+    # (see gunicorn.conf.py), so they start warm and share the pages.
+    start = time.perf_counter()
+    candidate_set = get_candidate_set()
+    for data in store.entries():
+        warm_candidate_data(data)
+    warm_candidate_set(candidate_set)
+
+    preload_stats["seconds"] = time.perf_counter() - start
+    preload_stats["finished_at"] = time.time()
+    logging.info(f"Preloaded {len(candidate_set.versions)} candidates in {preload_stats['seconds']:.2f}s")
+    return candidate_set
+
+
+# Set by refresh(): when it last looked at the files and last swapped in new
+# data, which candidates that reloaded, and the last error of the refresh thread
+refresh_stats = {"checked_at": None, "refreshed_at": None, "candidates": [], "seconds": None, "error": None}
+
+
+def refresh():
+    # Loads the candidates whose files changed, builds everything derived from
+    # them and only then swaps each into the store, then does the same for
+    # the stacked set. Requests keep using the previous data until the swap
+    # and never wait on a reload. Returns the candidates that were reloaded.
+    start = time.perf_counter()
+    reloaded = []
+    # Candidates evicted to stay within MAX_BYTES are only reloaded when
+    # their files changed since the candidate set was built
+    loaded = {data.candidate for data in store.entries()}
+    known = _candidate_set.signatures if _candidate_set is not None else {}
+    for candidate, signature in store.changed().items():
+        if signature is None:
+            store.evict(candidate)
+            logging.info(f"Dropped {candidate}: its contributions file is gone")
+            continue
+        if candidate not in loaded and known.get(candidate) == signature:
+            continue
+        data = store.load(candidate)
+        warm_candidate_data(data)
+        store.put(candidate, signature, data)
+        reloaded.append(candidate)
+    update_candidate_set(warm=True)
+
+    refresh_stats["checked_at"] = time.time()
+    refresh_stats["error"] = None
+    if reloaded:
+        refresh_stats["refreshed_at"] = refresh_stats["checked_at"]
+        refresh_stats["candidates"] = reloaded
+        refresh_stats["seconds"] = time.perf_counter() - start
+        logging.info(f"Refreshed {', '.join(reloaded)} in {refresh_stats['seconds']:.2f}s")
+    return reloaded
+
+
+def status():
+    # Data version and load times of what this process serves. Unless the
+    # background refresh keeps the store current, loads any candidate whose
+    # files are missing from the store or have changed.
+    candidate_set = get_candidate_set()
+    loaded = {data.candidate: data for data in store.entries()}
+    return {
+        "ready": bool(candidate_set.versions),
+        "data_version": candidate_set.version,
+        "candidates": {
+            candidate: {
+                "version": version,
+                "modified": loaded[candidate].modified if candidate in loaded else None,
+                "load_seconds": round(loaded[candidate].load_seconds, 4) if candidate in loaded else None,
+                "loaded_at": loaded[candidate].loaded_at if candidate in loaded else None,
+            }
+            for candidate, version in candidate_set.versions.items()
+        },
+        "preload": preload_stats,
+        "refresh": {"watching": store.watched, **refresh_stats},
+    }
@@ -0,0 +1,105 @@
+import re
+from collections import defaultdict
+
+from rapidfuzz import fuzz, process
+
+from cleaning_scripts.contributor_names import normalize_name_query
+
+# Per-candidate donor name index, built once per loaded data version.
+# Search works on ContributorKey (upper-cased, punctuation folded to spaces)
+# so it never scans the frame: exact lookups hit a dict, substring lookups
+# intersect trigram postings, and rapidfuzz ranks suggestions when nothing
+# contains the query. Results are per resolved donor (ContributorID): every
+# spelling of a donor's name finds all of their rows.
+
+SUGGESTION_LIMIT = 25
+FUZZY_SCORE_CUTOFF = 80
+
+
+def query_key(query):
+    # Queries with no letters or digits match nothing rather than "UNKNOWN"
+    if not re.search(r"[A-Za-z0-9]", query):
+        return None
+    return normalize_name_query(query)
+
+
+def trigrams(key):
+    return {key[i:i + 3] for i in range(len(key) - 2)}
+
+
+class DonorIndex:
+    def __init__(self, frame):
+        # Keys and donors keep the order they first appear in the data
+        positions = frame.groupby("ContributorID", sort=False).indices
+        first_keys = frame.drop_duplicates("ContributorKey")
+        first_donors = frame.drop_duplicates("ContributorID")
+
+        self.keys = first_keys["ContributorKey"].tolist()
+        self.donors = first_keys["ContributorID"].tolist()  # key id -> ContributorID
+        self.names = dict(zip(first_donors["ContributorID"], first_donors["ContributorName"]))
+        self.rows = {key: positions[donor] for key, donor in zip(self.keys, self.donors)}
+
+        self._postings = defaultdict(set)  # trigram -> key ids
+        for key_id, key in enumerate(self.keys):
+            for gram in trigrams(key):
+                self._postings[gram].add(key_id)
+
+    def __len__(self):
+        return len(self.names)
+
+    def lookup(self, query):
+        # Row positions of the donor one of whose keys equals the normalized query, or None
+        key = query_key(query)
+        return None if key is None else self.rows.get(key)
+
+    def substring_ids(self, key):
+        grams = trigrams(key)
+        if grams:
+            # Only keys sharing every trigram of the query can contain it
+            candidates = set.intersection(*(self._postings.get(gram, set()) for gram in grams))
+            return sorted(key_id for key_id in candidates if key in self.keys[key_id])
+        # Queries shorter than a trigram scan the unique keys
+        return [key_id for key_id, name in enumerate(self.keys) if key in name]
+
+    def fuzzy_ids(self, key, limit, score_cutoff=FUZZY_SCORE_CUTOFF):
+        matches = process.extract(
+            key,
+            self.keys,
+            scorer=fuzz.token_sort_ratio,
+            limit=limit,
+            score_cutoff=score_cutoff,
+        )
+        return [key_id for _, _, key_id in matches]
+
+    def suggest(self, query, limit=SUGGESTION_LIMIT, cursor=0):
+        # One page of names containing the query, else of the closest fuzzy
+        # matches. Returns (names, cursor of the next page or None).
+        key = query_key(query)
+        if key is None:
+            return [], None
+        key_ids = self.substring_ids(key) or self.fuzzy_ids(key, cursor + limit + 1)
+        # Several spellings of one donor are suggested once
+        donors = list(dict.fromkeys(self.donors[key_id] for key_id in key_ids))
+        end = cursor + limit
+        names = [self.names[donor] for donor in donors[cursor:end]]
+        return names, (end if len(donors) > end else None)
+
+
+class GlobalDonorIndex:
+    # One donor index across every candidate, so "who did this donor give
+    # to" is a single lookup. Built over the stacked frame of all candidates,
+    # whose Candidate column says which campaign each row went to.
+    def __init__(self, frame):
+        self.frame = frame
+        self.index = DonorIndex(frame)
+
+    def __len__(self):
+        return len(self.index)
+
+    def lookup(self, query):
+        # Contributions by the donor whose key equals the query, or None
+        rows = self.index.lookup(query)
+        return None if rows is None else self.frame.iloc[rows]
+
+    def suggest(self, query, limit=SUGGESTION_LIMIT, cursor=0):
+        return self.index.suggest(query, limit, cursor)
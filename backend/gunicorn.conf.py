@@ -0,0 +1,44 @@
+import gc
+import multiprocessing
+import os
+
+# Production serving: gunicorn app:app, run from backend/ (this file is picked
+# up from the working directory). The app and every candidate's data,
+# aggregates and indexes are loaded once in the master; workers fork from it
+# warm and share those pages copy-on-write instead of each loading its own copy.
+#
+# Environment:
+#   PORT               port to listen on (default 8000)
+#   WEB_CONCURRENCY    worker processes (default: 2 x CPUs + 1, at most 8)
+#   GUNICORN_THREADS   threads per worker (default 4)
+#   GUNICORN_TIMEOUT   seconds before a silent worker is restarted (default 60)
+#   GUNICORN_PRELOAD   set to 0 to load the data in each worker instead
+# and DATA_REFRESH_INTERVAL / DATA_BUILD_INTERVAL for the background data
+# refresh each worker runs (see refresher.py)
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", str(min(2 * multiprocessing.cpu_count() + 1, 8))))
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+worker_class = "gthread"
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60"))
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") != "0"
+accesslog = "-"
+
+
+def when_ready(server):
+    # Runs in the master after the app is imported, before any worker forks
+    if not preload_app:
+        return
+    from data_store import preload
+
+    preload()
+    # Move everything loaded so far out of the collector's generations, so
+    # garbage collection in the workers does not write to the shared pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Threads do not survive the fork, so each worker starts its own refresh
+    from refresher import refresher
+
+    refresher.start()
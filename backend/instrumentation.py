@@ -0,0 +1,185 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from flask import Response, g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+
+# Opt-in request instrumentation, enabled with API_INSTRUMENTATION=1:
+# - phase() timers around loading, transforming, aggregating, serializing and
+#   compressing, reported per request in a Server-Timing header
+# - request and phase totals for this process on /metrics (Prometheus text
+#   format; under gunicorn every worker reports its own)
+# - with API_PROFILE_TOKEN set, a request carrying ?profile=<token> or an
+#   X-Profile-Token header is sampled and answered with its collapsed stacks
+#   (one "frame;frame;frame count" line per stack, ready for flamegraph tools)
+# Disabled, phase() does nothing and no hooks or routes are registered.
+
+ENABLED = os.environ.get("API_INSTRUMENTATION", "") in ("1", "true", "yes")
+PROFILE_TOKEN = os.environ.get("API_PROFILE_TOKEN") or None
+PROFILE_INTERVAL = float(os.environ.get("API_PROFILE_INTERVAL", "0.001"))
+
+PHASES = ("load", "transform", "aggregate", "serialize", "compress")
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Counter()  # (endpoint, status) -> count
+        self.duration_sum = defaultdict(float)  # endpoint -> seconds
+        self.duration_buckets = defaultdict(lambda: [0] * (len(DURATION_BUCKETS) + 1))
+        self.phase_sum = defaultdict(float)  # phase -> seconds
+        self.phase_count = Counter()
+
+    def observe_request(self, endpoint, status, seconds):
+        with self._lock:
+            self.requests[(endpoint, status)] += 1
+            self.duration_sum[endpoint] += seconds
+            buckets = self.duration_buckets[endpoint]
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    buckets[i] += 1
+            buckets[-1] += 1  # +Inf
+
+    def observe_phase(self, name, seconds):
+        with self._lock:
+            self.phase_sum[name] += seconds
+            self.phase_count[name] += 1
+
+    def render(self, gauges):
+        with self._lock:
+            lines = ["# TYPE api_requests_total counter"]
+            for (endpoint, status), count in sorted(self.requests.items()):
+                lines.append(f'api_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+
+            lines.append("# TYPE api_request_duration_seconds histogram")
+            for endpoint, buckets in sorted(self.duration_buckets.items()):
+                for bound, count in zip(DURATION_BUCKETS, buckets):
+                    lines.append(f'api_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {count}')
+                lines.append(f'api_request_duration_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} {buckets[-1]}')
+                lines.append(f'api_request_duration_seconds_sum{{endpoint="{endpoint}"}} {self.duration_sum[endpoint]:.6f}')
+                lines.append(f'api_request_duration_seconds_count{{endpoint="{endpoint}"}} {buckets[-1]}')
+
+            lines.append("# TYPE api_phase_duration_seconds summary")
+            for name in sorted(self.phase_sum):
+                lines.append(f'api_phase_duration_seconds_sum{{phase="{name}"}} {self.phase_sum[name]:.6f}')
+                lines.append(f'api_phase_duration_seconds_count{{phase="{name}"}} {self.phase_count[name]}')
+
+        for name, value in gauges.items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+@contextmanager
+def phase(name):
+    # Times a block as one phase of the current request (and of the process
+    # totals). Phases of the same name within a request add up.
+    if not ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.observe_phase(name, elapsed)
+        if has_request_context() and "phases" in g:
+            g.phases[name] = g.phases.get(name, 0.0) + elapsed
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    # jsonify() time is the serialize phase
+    def dumps(self, obj, **kwargs):
+        with phase("serialize"):
+            return super().dumps(obj, **kwargs)
+
+
+class SamplingProfiler:
+    # Samples one thread's stack from a background thread every interval
+    # seconds and counts identical stacks
+    def __init__(self, thread_id, interval=PROFILE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+
+def profile_requested():
+    if PROFILE_TOKEN is None:
+        return False
+    return PROFILE_TOKEN in (request.args.get("profile"), request.headers.get("X-Profile-Token"))
+
+
+def server_timing(phases, total):
+    entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in phases.items()]
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
+
+
+def init_app(app, gauges=None):
+    # gauges() returns {metric name: value} for /metrics, read at scrape time
+    if not ENABLED:
+        return
+    app.json = TimedJSONProvider(app)
+
+    @app.before_request
+    def start_timing():
+        g.started = time.perf_counter()
+        g.phases = {}
+        if profile_requested():
+            # Profiled requests always run the view, never a cached body
+            g.bypass_cache = True
+            g.profiler = SamplingProfiler(threading.get_ident())
+            g.profiler.start()
+
+    @app.after_request
+    def finish_timing(response):
+        if "started" not in g:
+            return response
+        total = time.perf_counter() - g.started
+        metrics.observe_request(request.endpoint or "unmatched", response.status_code, total)
+        response.headers["Server-Timing"] = server_timing(g.phases, total)
+
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.stop()
+            profile = Response(profiler.collapsed(), mimetype="text/plain")
+            profile.headers["Server-Timing"] = response.headers["Server-Timing"]
+            profile.headers["X-Profile-Samples"] = str(sum(profiler.stacks.values()))
+            profile.headers["Cache-Control"] = "no-store"
+            return profile
+        return response
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics_endpoint():
+        return Response(metrics.render(gauges() if gauges else {}), mimetype="text/plain; version=0.0.4")
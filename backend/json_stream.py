@@ -0,0 +1,69 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Cursor/limit pagination and chunked JSON output for endpoints that return
+# lists of records. A cursor is the offset of the first record of a page.
+# Streamed responses serialize a chunk of rows at a time, so the body is
+# never held in memory as one list of dicts.
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+STREAM_CHUNK_SIZE = 1000
+
+
+def dumps(value):
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def read_page(args, default_limit=DEFAULT_PAGE_SIZE, max_limit=MAX_PAGE_SIZE):
+    # (cursor, limit) from the query string; raises ValueError on bad input
+    message = f"cursor must be an integer >= 0 and limit an integer between 1 and {max_limit}"
+    try:
+        cursor = int(args.get("cursor", 0))
+        limit = int(args.get("limit", default_limit))
+    except ValueError:
+        raise ValueError(message)
+    if cursor < 0 or not 0 < limit <= max_limit:
+        raise ValueError(message)
+    return cursor, limit
+
+
+def wants_stream(args):
+    return args.get("stream", "").lower() in ("1", "true", "yes")
+
+
+def next_cursor(cursor, limit, total):
+    end = cursor + limit
+    return end if end < total else None
+
+
+def frame_records(frame, columns=None):
+    # Records of a (small) frame built from its column arrays
+    columns = list(columns if columns is not None else frame.columns)
+    values = [frame[column].tolist() for column in columns]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+def iter_chunks(frame, chunk_size=STREAM_CHUNK_SIZE):
+    for start in range(0, len(frame), chunk_size):
+        yield frame.iloc[start:start + chunk_size]
+
+
+def iter_json_object(fields, records_key, record_chunks):
+    # Yields {**fields, records_key: [...]} as bytes, one chunk of records at a time
+    head = dumps(fields)[:-1]
+    yield head + (b"," if fields else b"") + dumps(records_key) + b":["
+    first = True
+    for records in record_chunks:
+        if not records:
+            continue
+        body = dumps(records)[1:-1]
+        yield body if first else b"," + body
+        first = False
+    yield b"]}"
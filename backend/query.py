@@ -0,0 +1,162 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from json_stream import frame_records
+
+# Ad-hoc group-by queries over one candidate's loaded frame, for
+# /api/query/<candidate>:
+#   ?group_by=Employer,month      one or more of DIMENSIONS (default ContributorGroup)
+#   ?start=&end=                  contribution dates (YYYY-MM-DD), both inclusive
+#   ?min_amount=&max_amount=      contribution amounts, both inclusive
+#   ?group=Union&group=Corporate  ContributorGroup values to keep (repeated or comma separated)
+#   ?top=N                        the N largest groups by amount (default TOP_N)
+# Filters are boolean masks and grouping runs on categorical columns built
+# once per data version. Employers are grouped on the resolved EmployerID and
+# labelled like top_employers; records missing a dimension are left out of
+# the groups but counted in the matched totals.
+# Results are cached per data version on the normalized query, so spellings
+# of the same query (argument order, repeated or comma separated values)
+# share one entry.
+
+DIMENSIONS = ("ContributorGroup", "Employer", "Occupation", "Donor_City", "Donor_State", "month")
+DEFAULT_GROUP_BY = ("ContributorGroup",)
+TOP_N = 10
+MAX_TOP = 1000
+
+MAX_CACHED_RESULTS = int(os.environ.get("QUERY_CACHE_MAX_ENTRIES", "256"))
+
+
+def split_values(args, name):
+    # ?name=a,b&name=c -> ["a", "b", "c"], blanks dropped
+    return [value.strip() for raw in args.getlist(name) for value in raw.split(",") if value.strip()]
+
+
+def parse_date(value, name):
+    try:
+        return pd.Timestamp(value).strftime("%Y-%m-%d")
+    except ValueError:
+        raise ValueError(f"{name} must be a date (YYYY-MM-DD)")
+
+
+def parse_amount(value, name):
+    try:
+        amount = float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+    if not np.isfinite(amount):
+        raise ValueError(f"{name} must be a number")
+    return amount
+
+
+def parse_query(args):
+    # Normalized query from the query string; raises ValueError on bad input.
+    # group_by keeps the order it was given in (it orders the record fields).
+    group_by = tuple(dict.fromkeys(split_values(args, "group_by"))) or DEFAULT_GROUP_BY
+    unknown = [dimension for dimension in group_by if dimension not in DIMENSIONS]
+    if unknown:
+        raise ValueError(f"group_by must be among {', '.join(DIMENSIONS)}")
+
+    start = parse_date(args["start"], "start") if args.get("start") else None
+    end = parse_date(args["end"], "end") if args.get("end") else None
+    min_amount = parse_amount(args["min_amount"], "min_amount") if args.get("min_amount") else None
+    max_amount = parse_amount(args["max_amount"], "max_amount") if args.get("max_amount") else None
+
+    message = f"top must be an integer between 1 and {MAX_TOP}"
+    try:
+        top = int(args.get("top", TOP_N))
+    except ValueError:
+        raise ValueError(message)
+    if not 0 < top <= MAX_TOP:
+        raise ValueError(message)
+
+    return {
+        "group_by": group_by,
+        "start": start,
+        "end": end,
+        "min_amount": min_amount,
+        "max_amount": max_amount,
+        "groups": tuple(sorted(set(split_values(args, "group")))),
+        "top": top,
+    }
+
+
+def query_key(query):
+    return tuple(query.items())
+
+
+def query_columns(frame):
+    # Every grouping dimension as a categorical column
+    columns = {
+        dimension: frame[dimension].astype("category")
+        for dimension in ("ContributorGroup", "Occupation", "Donor_City", "Donor_State")
+    }
+    labels = frame.groupby("EmployerID", sort=False)["Employer"].first()
+    columns["Employer"] = frame["EmployerID"].map(labels).astype("category").rename("Employer")
+    columns["month"] = frame["ContributionDate"].dt.strftime("%Y-%m").astype("category").rename("month")
+    return columns
+
+
+class QueryEngine:
+    # Runs queries against one loaded data version and keeps the last
+    # MAX_CACHED_RESULTS results
+    def __init__(self, frame, max_results=MAX_CACHED_RESULTS):
+        self.columns = query_columns(frame)
+        self.dates = frame["ContributionDate"].to_numpy()
+        self.amounts = frame["ContributionAmount"]
+        self.max_results = max_results
+        self._results = OrderedDict()  # query key -> result
+        self._lock = threading.Lock()
+
+    def run(self, query):
+        key = query_key(query)
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+                return result
+
+        result = self._execute(query)
+        with self._lock:
+            self._results[key] = result
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+    def mask(self, query):
+        amounts = self.amounts.to_numpy()
+        mask = np.ones(len(amounts), dtype=bool)
+        if query["start"] is not None:
+            mask &= self.dates >= np.datetime64(query["start"])
+        if query["end"] is not None:
+            mask &= self.dates <= np.datetime64(query["end"])
+        if query["min_amount"] is not None:
+            mask &= amounts >= query["min_amount"]
+        if query["max_amount"] is not None:
+            mask &= amounts <= query["max_amount"]
+        if query["groups"]:
+            mask &= self.columns["ContributorGroup"].isin(query["groups"]).to_numpy()
+        return mask
+
+    def _execute(self, query):
+        mask = self.mask(query)
+        amounts = self.amounts[mask]
+        keys = [self.columns[dimension][mask] for dimension in query["group_by"]]
+        grouped = amounts.groupby(keys, observed=True).agg(["sum", "size"])
+        top = grouped.sort_values("sum", ascending=False, kind="stable").head(query["top"])
+
+        rows = top.reset_index().rename(columns={"sum": "amount", "size": "count"})
+        rows[list(query["group_by"])] = rows[list(query["group_by"])].astype(object)
+        rows["amount"] = rows["amount"].round(2)
+        return {
+            "total_groups": len(grouped),
+            "matched": {"amount": round(float(amounts.sum()), 2), "count": int(len(amounts))},
+            "records": frame_records(rows),
+        }
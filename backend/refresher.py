@@ -0,0 +1,108 @@
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+import data_store
+
+# Background data refresh for the API process. Every REFRESH_INTERVAL
+# seconds a daemon thread looks for combined contributions files that
+# changed, loads and warms the new data off the request path and swaps it in
+# (data_store.refresh). Requests keep being served from the loaded data and
+# never wait on a reload. The pipeline replaces its outputs with an atomic
+# rename, so a reload never reads a file that is still being written.
+#
+# With DATA_BUILD_INTERVAL set, the thread also runs the cleaning pipeline
+# (update_all_donations) in a subprocess that often, checked at each refresh.
+# The build manifest makes runs with unchanged inputs cheap, and a lock file
+# keeps gunicorn workers from building at the same time. This needs the
+# pipeline's dependencies (requirements-pipeline.txt) and writes to
+# cleaning_scripts/output.
+#
+# Under gunicorn every worker starts its own thread (post_fork in
+# gunicorn.conf.py); `python app.py` starts one too.
+#
+# Environment:
+#   DATA_REFRESH_INTERVAL  seconds between checks for new data (default 30, 0 disables)
+#   DATA_BUILD_INTERVAL    seconds between pipeline runs (default 0: never)
+#   DATA_BUILD_TIMEOUT     seconds a pipeline run may take (default 1800)
+
+REFRESH_INTERVAL = float(os.environ.get("DATA_REFRESH_INTERVAL", "30"))
+BUILD_INTERVAL = float(os.environ.get("DATA_BUILD_INTERVAL", "0"))
+BUILD_TIMEOUT = float(os.environ.get("DATA_BUILD_TIMEOUT", "1800"))
+
+PIPELINE_DIR = os.path.join(os.path.dirname(__file__), "cleaning_scripts")
+BUILD_COMMAND = [sys.executable, "-c", "import campaigndonations; campaigndonations.update_all_donations()"]
+BUILD_LOCK = os.path.join(PIPELINE_DIR, "output", ".build.lock")
+
+
+def run_build():
+    # Runs the pipeline unless another process is running it; True on success
+    with open(BUILD_LOCK, "a") as lock:
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                logging.info("Data build already running in another process, skipping")
+                return False
+        start = time.perf_counter()
+        try:
+            result = subprocess.run(
+                BUILD_COMMAND, cwd=PIPELINE_DIR, capture_output=True, text=True, timeout=BUILD_TIMEOUT
+            )
+        except subprocess.TimeoutExpired:
+            logging.error(f"Data build timed out after {BUILD_TIMEOUT:.0f}s")
+            return False
+    if result.returncode != 0:
+        logging.error(f"Data build failed:\n{result.stderr[-4000:]}")
+        return False
+    logging.info(f"Data build finished in {time.perf_counter() - start:.1f}s")
+    return True
+
+
+class Refresher:
+    def __init__(self, interval=REFRESH_INTERVAL, build_interval=BUILD_INTERVAL):
+        self.interval = interval
+        self.build_interval = build_interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        # Returns False when disabled or already running
+        if self.interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return False
+        data_store.store.watched = True
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="data-refresh", daemon=True)
+        self._thread.start()
+        logging.info(f"Checking for new data every {self.interval:g}s")
+        return True
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        data_store.store.watched = False
+
+    def _run(self):
+        last_build = time.monotonic()
+        while not self._stop.wait(self.interval):
+            try:
+                if self.build_interval > 0 and time.monotonic() - last_build >= self.build_interval:
+                    last_build = time.monotonic()
+                    run_build()
+                data_store.refresh()
+            except Exception as e:
+                # Keep serving what is loaded and try again next time
+                logging.exception("Data refresh failed")
+                data_store.refresh_stats["error"] = str(e)
+
+
+refresher = Refresher()
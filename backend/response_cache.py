@@ -0,0 +1,159 @@
+import glob
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, g, request
+from werkzeug.http import http_date
+
+from instrumentation import phase
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# HTTP caching for the JSON API. A response is identified by its route,
+# arguments and the version (SHA-256) of the data it was built from, so:
+# - a client sending a matching If-None-Match gets a 304 without the view running
+# - a 200 body is kept in an LRU together with its gzip and brotli encodings,
+#   and served again without re-rendering until the data changes.
+# Data only changes when the cleaning scripts run, so clients revalidate
+# (max-age defaults to 0) instead of re-downloading.
+
+BASE_DIR = os.path.dirname(__file__)
+
+MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+MAX_AGE = int(os.environ.get("RESPONSE_CACHE_MAX_AGE", "0"))
+MIN_COMPRESS_BYTES = 512
+
+
+def code_version():
+    # Responses also change when the code that renders them does. Hashing the
+    # sources (not the process start time) keeps ETags equal across workers.
+    digest = hashlib.sha256()
+    sources = glob.glob(os.path.join(BASE_DIR, "*.py")) + glob.glob(os.path.join(BASE_DIR, "cleaning_scripts", "*.py"))
+    for path in sorted(sources):
+        with open(path, "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+CODE_VERSION = os.environ.get("RESPONSE_CACHE_SALT") or code_version()
+
+
+class CachedBody:
+    def __init__(self, body, mimetype):
+        self.mimetype = mimetype
+        self.encodings = {"identity": body}
+        if len(body) >= MIN_COMPRESS_BYTES:
+            with phase("compress"):
+                self.encodings["gzip"] = gzip.compress(body, compresslevel=6)
+                if brotli is not None:
+                    self.encodings["br"] = brotli.compress(body, quality=5)
+        self.nbytes = sum(len(encoded) for encoded in self.encodings.values())
+
+
+class ResponseCache:
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # etag -> CachedBody
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, etag):
+        with self._lock:
+            entry = self._entries.get(etag)
+            if entry is not None:
+                self._entries.move_to_end(etag)
+            return entry
+
+    def put(self, etag, entry):
+        with self._lock:
+            old = self._entries.pop(etag, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[etag] = entry
+            self._bytes += entry.nbytes
+            while len(self._entries) > 1 and self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def total_bytes(self):
+        with self._lock:
+            return self._bytes
+
+
+cache = ResponseCache()
+
+
+def request_etag(version):
+    args = sorted(request.args.items(multi=True))
+    key = repr((CODE_VERSION, version, request.endpoint, sorted(request.view_args.items()), args))
+    # Weak: the gzip, brotli and identity bodies are the same entity
+    return 'W/"' + hashlib.sha256(key.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def pick_encoding(entry):
+    accepted = request.accept_encodings
+    for encoding in ("br", "gzip"):
+        if encoding in entry.encodings and accepted[encoding]:
+            return encoding
+    return "identity"
+
+
+def set_cache_headers(response, etag, modified):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = f"public, max-age={MAX_AGE}, must-revalidate"
+    response.vary.add("Accept-Encoding")
+    if modified:
+        response.headers["Last-Modified"] = http_date(modified)
+    return response
+
+
+def not_modified(etag, modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag.removeprefix("W/").strip('"'))
+    if request.if_modified_since and modified:
+        return int(modified) <= request.if_modified_since.timestamp()
+    return False
+
+
+def cached_response(data_version):
+    # data_version(**view_args) returns the object the response is built from
+    # (anything with .version and .modified), or None to skip caching.
+    # Requests that set g.bypass_cache (profiled ones) always run the view.
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**view_args):
+            data = data_version(**view_args)
+            if data is None or g.get("bypass_cache"):
+                return view(**view_args)
+
+            etag = request_etag(data.version)
+            if not_modified(etag, data.modified):
+                return set_cache_headers(Response(status=304), etag, data.modified)
+
+            entry = cache.get(etag)
+            if entry is None:
+                response = view(**view_args)
+                if not isinstance(response, Response) or response.status_code != 200 or response.is_streamed:
+                    return response
+                entry = CachedBody(response.get_data(), response.mimetype)
+                cache.put(etag, entry)
+
+            encoding = pick_encoding(entry)
+            response = Response(entry.encodings[encoding], mimetype=entry.mimetype)
+            if encoding != "identity":
+                response.headers["Content-Encoding"] = encoding
+            return set_cache_headers(response, etag, data.modified)
+        return wrapper
+    return decorator